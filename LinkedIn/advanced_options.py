@@ -1,8 +1,8 @@
 import tkinter as tk
 from tkinter import messagebox
-import time
 import os
-import shutil
+
+from page_cache import CACHE_ROOT, PageCache
 
 class AdvancedSettings:
     def __init__(self, root):
@@ -14,6 +14,11 @@ class AdvancedSettings:
         # add note to make sure start and end are in employee range
         self.start = 0
         self.end = 0
+        # pages fetched at the same time and max requests per second, left empty to keep the defaults
+        self.concurrency = ""
+        self.rate = ""
+        # only write what changed since the last scrape, None until saved
+        self.delta = None
 
         self.create_widgets()
 
@@ -40,24 +45,56 @@ class AdvancedSettings:
         self.end_entry = tk.Entry(self.master, width=5)
         self.end_entry.grid(row=2, column=3, padx=5, pady=5)
 
+        # Concurrency and Request Rate Entry
+        self.concurrency_label = tk.Label(self.master, text="Concurrent Pages: ")
+        self.concurrency_label.grid(row=3, column=0, padx=5, pady=5, sticky=tk.E)
+        self.concurrency_entry = tk.Entry(self.master, width=5)
+        self.concurrency_entry.grid(row=3, column=1, padx=5, pady=5)
+
+        self.rate_label = tk.Label(self.master, text="Requests/sec: ")
+        self.rate_label.grid(row=3, column=2, padx=5, pady=5, sticky=tk.E)
+        self.rate_entry = tk.Entry(self.master, width=5)
+        self.rate_entry.grid(row=3, column=3, padx=5, pady=5)
+
+        # Delta Mode Checkbox
+        self.delta_var = tk.BooleanVar()
+        self.delta_check = tk.Checkbutton(self.master, text="Only Changes Since Last Scrape", variable=self.delta_var)
+        self.delta_check.grid(row=4, column=1, columnspan=2, pady=5)
+
+        # Clear Cache Filters, left empty to clear everything
+        self.clear_company_label = tk.Label(self.master, text="Clear Company: ")
+        self.clear_company_label.grid(row=5, column=0, padx=5, pady=5, sticky=tk.E)
+        self.clear_company_entry = tk.Entry(self.master, width=10)
+        self.clear_company_entry.grid(row=5, column=1, padx=5, pady=5)
+
+        self.clear_days_label = tk.Label(self.master, text="Older Than (days): ")
+        self.clear_days_label.grid(row=5, column=2, padx=5, pady=5, sticky=tk.E)
+        self.clear_days_entry = tk.Entry(self.master, width=5)
+        self.clear_days_entry.grid(row=5, column=3, padx=5, pady=5)
+
         # Clear Cache Button
         self.clear_cache_button = tk.Button(self.master, text="Clear Cache", command=self.clear_cache)
-        self.clear_cache_button.grid(row=3, column=1, columnspan=2, pady=10)
+        self.clear_cache_button.grid(row=6, column=1, columnspan=2, pady=10)
 
         # Save button
         self.clear_cache_button = tk.Button(self.master, text="Save and Exit", command=self.on_save)
-        self.clear_cache_button.grid(row=4, column=1, columnspan=2, pady=10)
+        self.clear_cache_button.grid(row=7, column=1, columnspan=2, pady=10)
 
     def clear_cache(self):
-        cache_folder_path = "LI_Scraper_companies"
+        cache_folder_path = CACHE_ROOT
+        company = self.clear_company_entry.get().strip()
+        days = self.clear_days_entry.get().strip()
 
+        # with a company or an age only those pages are cleared, otherwise every page goes. The rest of the
+        # cache folder (employee index, manifests, saved sessions, company names) is kept
         try:
-            # Check if the folder exists before attempting to delete
-            if os.path.exists(cache_folder_path):
-                shutil.rmtree(cache_folder_path)
-                messagebox.showinfo("Cache Deleted", f"The cache has been deleted successfully!")
-            else:
-                messagebox.showinfo("Cache Empty", f"The cache is already empty")
+            if not os.path.exists(cache_folder_path):
+                messagebox.showinfo("Cache Empty", "The cache is already empty")
+                return
+            page_cache = PageCache(cache_folder_path)
+            count = page_cache.clear(company=company or None, older_than_days=float(days) if days else None)
+            page_cache.close()
+            messagebox.showinfo("Cache Cleared", f"Cleared {count} cached pages")
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred: {str(e)}")
 
@@ -66,6 +103,9 @@ class AdvancedSettings:
         self.password = self.password_entry.get()
         self.start = self.start_entry.get()
         self.end = self.end_entry.get()
+        self.concurrency = self.concurrency_entry.get()
+        self.rate = self.rate_entry.get()
+        self.delta = self.delta_var.get()
 
         # check if start and end value are integers, or add custom codes, ie: half, quarter?
 
@@ -0,0 +1,455 @@
+"""
+LinkedIn Scraper - Benchmark
+
+Measures the throughput of the scraper's pipeline offline, nothing here logs in or goes to LinkedIn.
+
+    python benchmark.py run
+    python benchmark.py compare
+    python benchmark.py replay --pages 2000
+
+run measures parsing search pages (as get_employees does), categorize_job on headline corpora of 1k, 10k and
+100k rows against jobs.csv, and writing categorized pages to the csv (what finish_up closes off). The pages are
+the recorded fixtures in benchmark_fixtures/, the corpora are generated from jobs.csv with a fixed seed, so runs
+are comparable. Every run is appended to benchmark_results.jsonl, compare shows the last run against the one
+before it.
+
+record makes the fixtures, from raw responses kept in the page cache (ScraperEngine.cache_raw_pages) with the
+names and ids replaced, or from generated responses with --synthetic.
+
+replay compares reading cached pages cold (the full LinkedIn response, decoded and projected, see
+employee_pages.project_page) and warm (already projected), with the stdlib json decoder and get_item_key
+("before"), and with json_codec and the precompiled paths ("after").
+
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+import zlib
+
+import json_codec
+from employee_pages import PAGE_FORMAT, get_item_key, page_employees, project_page
+from job_categorizer import categorize_job, normalize_headline
+from job_matcher import load_job_matcher
+from job_ranker import load_job_ranker
+from output_writer import EmployeeCSVWriter
+from page_cache import CACHE_ROOT, PageCache
+
+# next to this file rather than in the working directory, so every run lands in the same place
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_PATH = os.path.join(BENCHMARK_DIR, "benchmark_fixtures", "search_pages.json.gz")
+RESULTS_PATH = os.path.join(BENCHMARK_DIR, "benchmark_results.jsonl")
+CORPUS_SIZES = (1000, 10000, 100000)
+
+FIRST_NAMES = ["Alex", "Sam", "Jordan", "Taylor", "Morgan", "Casey", "Riley", "Jamie", "Avery", "Quinn"]
+HEADLINES = ["Software Engineer", "Senior Data Analyst", "Product Manager", "Account Executive", "Recruiter",
+             "Staff Software Engineer II", "Marketing Manager", "Financial Analyst", "UX Designer",
+             "Customer Success Manager", "Director of Engineering", "Data Scientist", "Sales Development Rep"]
+LOCATIONS = ["San Francisco Bay Area", "New York, New York, United States", "London, England, United Kingdom",
+             "Bengaluru, Karnataka, India", "Austin, Texas, United States", "Toronto, Ontario, Canada"]
+
+
+def text(value):
+    return {"_type": "com.linkedin.voyager.dash.common.text.TextViewModel", "text": value,
+            "attributesV2": [], "accessibilityTextAttributesV2": [], "accessibilityText": None}
+
+
+def search_result(rng, index, headlines=HEADLINES):
+    # a search result as LinkedIn returns it, with the fields the scraper doesn't use left in
+    profile_id = f"ACoAA{rng.getrandbits(64):016X}"
+    return {
+        "_type": "com.linkedin.voyager.dash.search.EntityResultViewModel",
+        "entityUrn": f"urn:li:fsd_entityResultViewModel:(urn:li:fsd_profile:{profile_id},SEARCH_SRP,DEFAULT)",
+        "title": text(f"{rng.choice(FIRST_NAMES)} {index}"),
+        "primarySubtitle": text(rng.choice(headlines)),
+        "secondarySubtitle": text(rng.choice(LOCATIONS)),
+        "summary": None,
+        "badgeText": text("• 3rd+"),
+        "navigationUrl": f"https://www.linkedin.com/in/{profile_id}?miniProfileUrn=urn%3Ali%3Afs_miniProfile",
+        "trackingUrn": f"urn:li:member:{rng.getrandbits(30)}",
+        "trackingId": f"{rng.getrandbits(96):024x}",
+        "image": {"_type": "com.linkedin.voyager.dash.common.image.ImageViewModel", "attributes": [{
+            "detailData": {"nonEntityProfilePicture": {"vectorImage": {"rootUrl": "https://media.licdn.com/dms/",
+                "artifacts": [{"width": size, "height": size, "fileIdentifyingUrlPathSegment": f"{size}_{size}/0"}
+                              for size in (100, 200, 400, 800)]}}}}]},
+        "insightsResolutionResults": [{"simpleInsight": {"title": text("Works at Acme")}}],
+        "lazyLoadedActions": {"entityUrn": f"urn:li:fsd_lazyLoadedActions:{profile_id}"},
+    }
+
+
+def search_response(rng, offset, total=5000, headlines=HEADLINES):
+    """
+    Generate a voyagerSearchDashClusters response with 10 employees.
+
+    """
+    return {"data": {"searchDashClustersByAll": {
+        "_type": "com.linkedin.restli.common.CollectionResponse",
+        "metadata": {"totalResultCount": total, "primaryResultType": "PEOPLE"},
+        "paging": {"start": offset, "count": 10, "total": total},
+        "elements": [{
+            "_type": "com.linkedin.voyager.dash.search.SearchClusterViewModel",
+            "items": [{"_type": "com.linkedin.voyager.dash.search.SearchItem",
+                       "item": {"entityResult": search_result(rng, offset + index, headlines)}}
+                      for index in range(10)],
+        }],
+    }}}
+
+
+def scrub(value):
+    # same shape and size, no content, so parsing costs the same
+    if isinstance(value, dict):
+        return {key: value[key] if key == "_type" else scrub(value[key]) for key in value}
+    if isinstance(value, list):
+        return [scrub(item) for item in value]
+    if isinstance(value, str):
+        return "x" * len(value)
+    if isinstance(value, bool) or value is None:
+        return value
+    return 0
+
+
+def anonymize_response(r, salt=""):
+    """
+    Anonymize a recorded search response for the fixtures.
+
+    Only the headline and location of each search result are kept, they are what the benchmark categorizes.
+    The name becomes "Member <hash>", the profile id in the entityUrn is replaced by a hash of itself, and every
+    other string is replaced by x's of the same length, so the response still parses like the original.
+    Of the metadata only totalResultCount is kept.
+
+    Parameters:
+        r (dict): A voyagerSearchDashClusters response.
+        salt (str): Mixed into the hashes, so ids can't be looked up by hashing known ids.
+
+    Returns:
+        dict: The anonymized response.
+
+    """
+    clusters = r["data"]["searchDashClustersByAll"]
+    anonymized = {"data": {"searchDashClustersByAll": {key: value if key == "_type" else scrub(value)
+                                                       for key, value in clusters.items() if key != "elements"}}}
+    # the metadata can hold the search keywords and tracking ids, only the result count is needed to page
+    metadata = clusters.get("metadata")
+    if isinstance(metadata, dict) and "totalResultCount" in metadata:
+        anonymized["data"]["searchDashClustersByAll"]["metadata"]["totalResultCount"] = metadata["totalResultCount"]
+    elements = []
+    for cluster in clusters.get("elements") or []:
+        items = []
+        for it in cluster.get("items") or []:
+            e = get_item_key(it, ["item", "entityResult"])
+            if not e:
+                items.append(scrub(it))
+                continue
+            urn = e.get("entityUrn", "")
+            fake_id = "ACoAA" + hashlib.sha1(f"{salt}{urn}".encode("utf-8")).hexdigest()[:16].upper()
+            result = scrub(e)
+            result["entityUrn"] = f"urn:li:fsd_entityResultViewModel:(urn:li:fsd_profile:{fake_id},SEARCH_SRP,DEFAULT)"
+            result["title"] = text(f"Member {fake_id[5:13]}")
+            result["primarySubtitle"] = text(get_item_key(e, ["primarySubtitle", "text"]))
+            result["secondarySubtitle"] = text(get_item_key(e, ["secondarySubtitle", "text"]))
+            items.append({"_type": it["_type"], "item": {"entityResult": result}})
+        elements.append({"_type": cluster["_type"], "items": items})
+    anonymized["data"]["searchDashClustersByAll"]["elements"] = elements
+    return anonymized
+
+
+def save_fixtures(responses, path=FIXTURES_PATH):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with gzip.open(path, "wb") as f:
+        f.write(json_codec.dumps(responses))
+    print(f"Saved {len(responses)} pages to {path}")
+
+
+def load_fixtures(path=FIXTURES_PATH):
+    with gzip.open(path, "rb") as f:
+        return json_codec.loads(f.read())
+
+
+def record_fixtures(company_ids=None, root=CACHE_ROOT, path=FIXTURES_PATH, limit=50, synthetic=False,
+                    csv_path="jobs.csv", seed=0):
+    """
+    Make the page fixtures, from raw responses in the page cache or generated ones.
+
+    Parameters:
+        company_ids (list): Companies to take pages from, every cached company if None.
+        root (str): Cache folder to read the raw responses from.
+        path (str): Path of the fixture file.
+        limit (int): Max number of pages.
+        synthetic (bool): Generate the pages, with headlines from the jobs csv, instead of using the cache.
+        csv_path (str): Path to the jobs csv.
+        seed (int): Seed of the generated pages.
+
+    Returns:
+        list: The anonymized responses.
+
+    """
+    if synthetic:
+        rng = random.Random(seed)
+        headlines = headline_corpus(limit * 10, csv_path, seed)
+        responses = [anonymize_response(search_response(rng, offset * 10, headlines=headlines))
+                     for offset in range(limit)]
+    else:
+        # raw responses are only kept with ScraperEngine.cache_raw_pages on
+        responses = []
+        salt = os.urandom(8).hex()
+        page_cache = PageCache(root)
+        try:
+            for company_id in company_ids or page_cache.cached_company_ids():
+                for key, offset, _ in page_cache.iter_pages(company_id):
+                    raw = page_cache.get_raw(key, offset)
+                    if raw is not None and len(responses) < limit:
+                        responses.append(anonymize_response(raw, salt))
+        finally:
+            page_cache.close()
+        if not responses:
+            raise ValueError("No raw responses in the page cache, scrape with cache_raw_pages on or use --synthetic")
+    save_fixtures(responses, path)
+    return responses
+
+
+def headline_corpus(size, csv_path="jobs.csv", seed=0):
+    """
+    Generate headlines the way people write them, from the job titles in the jobs csv.
+
+    Parameters:
+        size (int): Number of headlines.
+        csv_path (str): Path to the jobs csv.
+        seed (int): Seed, the same seed and csv give the same corpus.
+
+    Returns:
+        list: The headlines.
+
+    """
+    rng = random.Random(seed)
+    titles = load_job_matcher(csv_path).jobs
+    prefixes = ["", "", "", "Senior ", "Sr. ", "Lead ", "Principal ", "Junior ", "Associate ", "Head of "]
+    suffixes = ["", "", "", " II", " III", " at Acme", " @ Globex", " | Open to work", " - Remote",
+                " | Helping teams grow", " at Initech Corp."]
+    headlines = []
+    for _ in range(size):
+        title = rng.choice(titles).title()
+        shape = rng.random()
+        if shape < 0.15:
+            title = f"{title} | {rng.choice(titles).title()}"
+        elif shape < 0.2:
+            title = f"{title} and {rng.choice(titles)}"
+        headlines.append(f"{rng.choice(prefixes)}{title}{rng.choice(suffixes)}")
+    return headlines
+
+
+def project_page_reference(j):
+    # project_page as it was, walking every path with get_item_key
+    page = {"format": PAGE_FORMAT, "total": get_item_key(j, ["metadata", "totalResultCount"]) or 0, "employees": []}
+    for it in j["elements"]:
+        for it in it["items"]:
+            e = it["item"]["entityResult"]
+            page["employees"].append([get_item_key(e, ["title", "text"]), get_item_key(e, "entityUrn"),
+                                      get_item_key(e, ["primarySubtitle", "text"]),
+                                      get_item_key(e, ["secondarySubtitle", "text"])])
+    return page
+
+
+def pages_per_second(blobs, read, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for blob in blobs:
+            read(blob)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(blobs) / best
+
+
+def bench_replay(pages=2000, seed=0):
+    """
+    Measure replay pages/sec for cold and warm cached pages, before and after the fast decode path.
+
+    Parameters:
+        pages (int): Number of generated pages.
+        seed (int): Seed of the generated pages.
+
+    Returns:
+        dict: pages/sec of every case, ie {"cold before": 1234.5, ...}.
+
+    """
+    rng = random.Random(seed)
+    responses = [search_response(rng, offset * 10) for offset in range(pages)]
+    # pages are stored compressed, as in the page cache
+    cold = [zlib.compress(json_codec.dumps(r)) for r in responses]
+    warm = [zlib.compress(json_codec.dumps(project_page(r["data"]["searchDashClustersByAll"]))) for r in responses]
+
+    def cold_before(blob):
+        return page_employees(project_page_reference(json.loads(zlib.decompress(blob))["data"]["searchDashClustersByAll"]))
+
+    def cold_after(blob):
+        return page_employees(project_page(json_codec.loads(zlib.decompress(blob))["data"]["searchDashClustersByAll"]))
+
+    return {
+        "cold before": pages_per_second(cold, cold_before),
+        "cold after": pages_per_second(cold, cold_after),
+        "warm before": pages_per_second(warm, lambda blob: page_employees(json.loads(zlib.decompress(blob)))),
+        "warm after": pages_per_second(warm, lambda blob: page_employees(json_codec.loads(zlib.decompress(blob)))),
+    }
+
+
+def bench_parse(responses, repeat=5):
+    """
+    Measure parsing search responses into employees, as fetch_employees and get_employees do with a response
+    from LinkedIn: decode, project and make the Employee records.
+
+    Returns:
+        dict: {"parse pages/sec", "parse employees/sec"}.
+
+    """
+    bodies = [json_codec.dumps(r) for r in responses]
+    employees = sum(len(page_employees(project_page(r["data"]["searchDashClustersByAll"]))) for r in responses)
+    rate = pages_per_second(bodies, lambda body: page_employees(
+        project_page(json_codec.loads(body)["data"]["searchDashClustersByAll"])), repeat)
+    return {"parse pages/sec": rate, "parse employees/sec": rate * employees / len(responses)}
+
+
+def bench_categorize(sizes=CORPUS_SIZES, csv_path="jobs.csv", seed=0):
+    """
+    Measure categorize_job on generated headline corpora, in this process and without the headline cache.
+
+    Returns:
+        dict: headlines/sec of every corpus, ie {"categorize 1k headlines/sec": 20000.0, ...}.
+
+    """
+    job_matcher = load_job_matcher(csv_path)
+    job_ranker = load_job_ranker(csv_path)
+    results = {}
+    for size in sizes:
+        headlines = [normalize_headline(headline) for headline in headline_corpus(size, csv_path, seed)]
+        start = time.perf_counter()
+        for headline in headlines:
+            categorize_job(headline, job_matcher, job_ranker)
+        elapsed = time.perf_counter() - start
+        results[f"categorize {size // 1000}k headlines/sec"] = size / elapsed
+    return results
+
+
+def bench_write(responses, csv_path="jobs.csv", pages=500):
+    """
+    Measure writing categorized pages to the csv, from parsed employees to the closed file, without the
+    headline cache so every headline is categorized.
+
+    Returns:
+        dict: {"write employees/sec"}.
+
+    """
+    pages = [page_employees(project_page(responses[index % len(responses)]["data"]["searchDashClustersByAll"]))
+             for index in range(pages)]
+    with tempfile.TemporaryDirectory() as directory:
+        writer = EmployeeCSVWriter(os.path.join(directory, "bench_linkedin_data.csv"), company_name="Acme",
+                                   csv_path=csv_path)
+        start = time.perf_counter()
+        for number, employees in enumerate(pages):
+            writer.write_page(employees, next_offset=(number + 1) * 10)
+        writer.close()
+        elapsed = time.perf_counter() - start
+    return {"write employees/sec": writer.rows / elapsed}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def run_suite(fixtures_path=FIXTURES_PATH, csv_path="jobs.csv", sizes=CORPUS_SIZES):
+    responses = load_fixtures(fixtures_path)
+    # the job matcher and ranker are built before anything is timed
+    load_job_ranker(csv_path)
+    results = {}
+    results.update(bench_parse(responses))
+    results.update(bench_categorize(sizes, csv_path))
+    results.update(bench_write(responses, csv_path))
+    return results
+
+
+def store_results(results, path=RESULTS_PATH):
+    run = {"time": time.strftime("%Y-%m-%d %H:%M:%S"), "commit": git_commit(), "python": platform.python_version(),
+           "machine": platform.node(), "json": json_codec.BACKEND,
+           "results": {name: round(rate, 1) for name, rate in results.items()}}
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(run) + "\n")
+    return run
+
+
+def load_results(path=RESULTS_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def compare_results(path=RESULTS_PATH):
+    """
+    Print the last stored run against the one before it.
+
+    """
+    runs = load_results(path)
+    if not runs:
+        print(f"No runs in {path}, run python benchmark.py run first")
+        return
+    last = runs[-1]
+    previous = runs[-2] if len(runs) > 1 else None
+    if previous is not None:
+        print(f"{previous['time']} ({previous['commit'] or '?'}) -> {last['time']} ({last['commit'] or '?'})")
+    for name, rate in last["results"].items():
+        before = previous["results"].get(name) if previous is not None else None
+        change = f" ({(rate - before) / before:+.1%} from {before:,.1f})" if before else ""
+        print(f"{name:>32}: {rate:12,.1f}{change}")
+    if previous is not None and (previous["machine"], previous["json"]) != (last["machine"], last["json"]):
+        print("The runs were on different machines or json decoders, so they aren't directly comparable")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the LinkedIn scraper offline.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="parse, categorize and write rates, stored in the results file")
+    run.add_argument("--fixtures", default=FIXTURES_PATH, help="fixture file of recorded pages")
+    run.add_argument("--results", default=RESULTS_PATH, help="file the results are appended to")
+    run.add_argument("--jobs", default="jobs.csv", help="path to the jobs csv")
+    run.add_argument("--sizes", type=int, nargs="*", default=CORPUS_SIZES, help="headline corpus sizes")
+    compare = commands.add_parser("compare", help="compare the last run to the one before it")
+    compare.add_argument("--results", default=RESULTS_PATH, help="results file")
+    record = commands.add_parser("record", help="make the page fixtures")
+    record.add_argument("--companies", nargs="*", help="company ids to take pages from, all cached if left out")
+    record.add_argument("--cache", default=CACHE_ROOT, help="cache folder to read the raw responses from")
+    record.add_argument("--fixtures", default=FIXTURES_PATH, help="fixture file to write")
+    record.add_argument("--limit", type=int, default=50, help="max number of pages")
+    record.add_argument("--synthetic", action="store_true", help="generate the pages instead")
+    record.add_argument("--jobs", default="jobs.csv", help="path to the jobs csv")
+    replay = commands.add_parser("replay", help="pages/sec of reading cached pages, cold and warm")
+    replay.add_argument("--pages", type=int, default=2000, help="number of generated pages")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        results = run_suite(args.fixtures, args.jobs, args.sizes)
+        store_results(results, args.results)
+        compare_results(args.results)
+    elif args.command == "compare":
+        compare_results(args.results)
+    elif args.command == "record":
+        record_fixtures(args.companies, args.cache, args.fixtures, args.limit, args.synthetic, args.jobs)
+    elif args.command == "replay":
+        results = bench_replay(args.pages)
+        print(f"json decoder: {json_codec.BACKEND}")
+        for case, rate in results.items():
+            print(f"{case:>12}: {rate:10.1f} pages/sec")
+
+
+if __name__ == "__main__":
+    main()
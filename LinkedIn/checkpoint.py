@@ -0,0 +1,144 @@
+import json
+import os
+import time
+
+from page_cache import CACHE_ROOT
+
+
+class RunManifest:
+    """
+    Checkpoint of a scrape of one company, so an interrupted scrape can be resumed where it stopped.
+
+    The manifest records the next offset to fetch, how far into the output csv the finished pages go,
+    the total number of employees and the settings the scrape was started with, plus any state the scrape needs
+    to carry on, ie the delta scan's counters. It is saved every time the output csv is flushed, so the two
+    always agree.
+
+    Parameters:
+        company_id (str): The LinkedIn company ID.
+        company_name (str): Name of the company.
+        output_path (str): Path of the csv being written.
+        settings (dict): Settings the scrape was started with, ie start and end values.
+        root (str): Cache folder the manifests are kept in.
+
+    """
+    def __init__(self, company_id, company_name="", output_path="", settings=None, root=CACHE_ROOT):
+        self.company_id = str(company_id)
+        self.company_name = company_name
+        self.output_path = output_path
+        self.settings = settings or {}
+        self.state = {}
+        self.next_offset = 0
+        self.position = 0
+        self.rows = 0
+        self.total = 0
+        self.complete = False
+        self.updated = time.time()
+        self.path = os.path.join(root, "manifests", f"{self.company_id}.json")
+        # profile urns already written by a sharded scrape, appended on every checkpoint
+        self.seen_path = os.path.join(root, "manifests", f"{self.company_id}.seen")
+        self.new_seen = []
+
+    @classmethod
+    def load(cls, company_id, root=CACHE_ROOT):
+        """
+        Load the manifest of the last scrape of a company.
+
+        Parameters:
+            company_id (str): The LinkedIn company ID.
+            root (str): Cache folder the manifests are kept in.
+
+        Returns:
+            RunManifest: The manifest, or None if the company has no manifest.
+
+        """
+        manifest = cls(company_id, root=root)
+        if not os.path.exists(manifest.path):
+            return None
+        with open(manifest.path) as f:
+            data = json.load(f)
+        for key in ("company_name", "output_path", "settings", "state", "next_offset", "position", "rows", "total",
+                    "complete", "updated"):
+            if key in data:
+                setattr(manifest, key, data[key])
+        return manifest
+
+    def can_resume(self):
+        """
+        Check if the scrape can be resumed, it must be unfinished and its csv must still hold the checkpointed rows.
+
+        """
+        return (not self.complete and os.path.exists(self.output_path)
+                and os.path.getsize(self.output_path) >= self.position)
+
+    def add_seen(self, urns):
+        """
+        Add profile urns written by a sharded scrape, they are saved with the next checkpoint.
+
+        """
+        self.new_seen.extend(urns)
+
+    def load_seen(self):
+        """
+        Get the profile urns saved up to the last checkpoint, for resuming a sharded scrape.
+
+        Urns added after the last checkpoint belong to pages that will be fetched again, so they are cut off.
+
+        Returns:
+            set: The profile urns.
+
+        """
+        position = self.state.get("seen_position", 0)
+        if not position or not os.path.exists(self.seen_path):
+            return set()
+        with open(self.seen_path, "r+b") as f:
+            f.truncate(position)
+            return set(f.read().decode("utf-8").split("\n")) - {""}
+
+    def save_seen(self):
+        if not self.new_seen and "seen_position" in self.state:
+            return
+        os.makedirs(os.path.dirname(self.seen_path), exist_ok=True)
+        # the first checkpoint of a scrape starts a new file
+        with open(self.seen_path, "ab" if "seen_position" in self.state else "wb") as f:
+            f.write("".join(urn + "\n" for urn in self.new_seen).encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+            self.state["seen_position"] = f.tell()
+        self.new_seen = []
+
+    def checkpoint(self, next_offset, position, rows, total=None):
+        if self.settings.get("sharded"):
+            self.save_seen()
+        self.next_offset = next_offset
+        self.position = position
+        self.rows = rows
+        if total is not None:
+            self.total = total
+        self.save()
+
+    def finish(self):
+        self.complete = True
+        self.save()
+
+    def save(self):
+        self.updated = time.time()
+        data = {
+            "company_id": self.company_id,
+            "company_name": self.company_name,
+            "output_path": self.output_path,
+            "settings": self.settings,
+            "state": self.state,
+            "next_offset": self.next_offset,
+            "position": self.position,
+            "rows": self.rows,
+            "total": self.total,
+            "complete": self.complete,
+            "updated": self.updated,
+        }
+        # written to a temporary file and moved into place, so a crash never leaves half a manifest
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,174 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from page_fetcher import fetch_pages
+from page_cache import CACHE_ROOT
+
+# left off the end of company names before they are compared, ie "Acme, Inc." is "acme"
+COMPANY_SUFFIXES = {"inc", "incorporated", "llc", "ltd", "limited", "corp", "corporation", "co", "company", "plc",
+                    "gmbh", "ag", "sa", "group", "holdings"}
+
+
+def normalize_company_name(name):
+    words = re.sub(r"[^a-z0-9&]+", " ", name.lower()).split()
+    if words and words[0] == "the":
+        words = words[1:]
+    while len(words) > 1 and words[-1] in COMPANY_SUFFIXES:
+        words = words[:-1]
+    return " ".join(words)
+
+
+def confident_match(companies, company_name):
+    """
+    Pick a company from search results when there is no doubt about it, the only result named like the search.
+
+    A single result with another name isn't accepted, it may be an unrelated company found for a typo or a
+    company LinkedIn doesn't know, and the pick would be remembered for every later run.
+
+    Parameters:
+        companies (list): Company objects from api.search_companies.
+        company_name (str): The name that was searched for.
+
+    Returns:
+        dict: The company object, or None if it's ambiguous.
+
+    """
+    name = normalize_company_name(company_name)
+    matches = [c for c in companies if normalize_company_name(c['name']) == name]
+    return matches[0] if len(matches) == 1 else None
+
+
+class CompanyResolver:
+    """
+    Resolves company names to LinkedIn companies, remembering every name that has been resolved.
+
+    A name is looked up by its normalized form, and both the searched name and the company's own name are
+    remembered, so "Acme Inc" and "acme" resolve to the same company. Names not resolved before are searched,
+    a confident match is accepted without asking, and only ambiguous ones are handed to choose.
+
+    Parameters:
+        root (str): Cache folder the resolutions are kept in.
+
+    """
+    def __init__(self, root=CACHE_ROOT):
+        os.makedirs(root, exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(root, "company_names.sqlite3"), check_same_thread=False)
+        with self.db:
+            self.db.execute("CREATE TABLE IF NOT EXISTS companies (alias TEXT PRIMARY KEY, urn_id TEXT, name TEXT, "
+                            "headline TEXT, resolved REAL)")
+
+    def lookup(self, company_name):
+        with self.lock:
+            row = self.db.execute("SELECT urn_id, name, headline FROM companies WHERE alias = ?",
+                                  (normalize_company_name(company_name),)).fetchone()
+        if row is None:
+            return None
+        return {"urn_id": row[0], "name": row[1], "headline": row[2]}
+
+    def remember(self, company_name, companyObj):
+        with self.lock, self.db:
+            for alias in {normalize_company_name(company_name), normalize_company_name(companyObj['name'])}:
+                self.db.execute("INSERT OR REPLACE INTO companies (alias, urn_id, name, headline, resolved) "
+                                "VALUES (?, ?, ?, ?, ?)",
+                                (alias, companyObj['urn_id'], companyObj['name'], companyObj.get('headline', ""),
+                                 time.time()))
+
+    def forget(self, company_name):
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM companies WHERE alias = ?", (normalize_company_name(company_name),))
+
+    def resolve(self, company_name, search, choose, remember_choice=True):
+        """
+        Resolve one company name.
+
+        Parameters:
+            company_name (str): The name of the company.
+            search (function): Called with a name, returns the company objects found, ie api.search_companies.
+            choose (function): Called with the company objects and the name when the match is ambiguous, returns the
+                company or None.
+            remember_choice (bool): Remember what choose picked, leave off if choose only guesses.
+
+        Returns:
+            dict: The company object, or None if none was picked.
+
+        """
+        companyObj = self.lookup(company_name)
+        if companyObj is not None:
+            return companyObj
+        # a failed search is raised for the caller
+        companies = search(company_name)
+        companyObj = self.accept_confident(company_name, companies)
+        if companyObj is not None:
+            return companyObj
+        return self.choose(company_name, companies, choose, remember_choice)
+
+    def accept_confident(self, company_name, companies):
+        companyObj = confident_match(companies, company_name)
+        if companyObj is not None:
+            print(f"Resolved {company_name} to {companyObj['name']} ({companyObj['urn_id']})")
+            self.remember(company_name, companyObj)
+        return companyObj
+
+    def choose(self, company_name, companies, choose, remember_choice=True):
+        companyObj = choose(companies, company_name) if companies else None
+        if companyObj is not None and remember_choice:
+            self.remember(company_name, companyObj)
+        return companyObj
+
+    def resolve_many(self, company_names, search, choose, concurrency=4, remember_choice=True):
+        """
+        Resolve a list of company names up front.
+
+        Names not resolved before are searched several at a time, and the ambiguous ones are handed to choose
+        one after another once every search is done, so choose can be a pop-up on the calling thread.
+        A search that fails is reported and its name left unresolved, the other names are still resolved.
+
+        Parameters:
+            company_names (list): The names of the companies.
+            search (function): Called with a name, returns the company objects found, ie api.search_companies.
+            choose (function): Called with the company objects and the name when the match is ambiguous, returns the
+                company or None.
+            concurrency (int): Max number of searches at the same time.
+            remember_choice (bool): Remember what choose picked, leave off if choose only guesses.
+
+        Returns:
+            dict: Company object of every name, None for names with no company picked. Names whose search
+            failed are left out.
+
+        """
+        def try_search(company_name):
+            try:
+                return search(company_name)
+            except Exception as error:
+                print(f"Search for {company_name} failed: {type(error).__name__}: {error}")
+                return None
+
+        resolved = {}
+        unknown = []
+        for company_name in company_names:
+            companyObj = self.lookup(company_name)
+            if companyObj is not None:
+                resolved[company_name] = companyObj
+            elif company_name not in unknown:
+                unknown.append(company_name)
+
+        ambiguous = []
+        for company_name, companies in fetch_pages(try_search, unknown, concurrency):
+            if companies is None:
+                continue
+            companyObj = self.accept_confident(company_name, companies)
+            if companyObj is not None:
+                resolved[company_name] = companyObj
+            else:
+                ambiguous.append((company_name, companies))
+
+        for company_name, companies in ambiguous:
+            resolved[company_name] = self.choose(company_name, companies, choose, remember_choice)
+        return resolved
+
+    def close(self):
+        self.db.close()
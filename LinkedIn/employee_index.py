@@ -0,0 +1,228 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from employee_pages import Employee
+from page_cache import CACHE_ROOT
+
+
+def employee_digest(emp):
+    # what counts as a change: the headline or the location
+    return hashlib.sha1(f"{emp.primarySubtitle}\0{emp.secondarySubtitle}".encode("utf-8")).hexdigest()[:16]
+
+
+class EmployeeIndex:
+    """
+    Index of every employee seen for each company, keyed by profile urn, plus a history of headcount snapshots.
+
+    Each employee keeps a hash of the headline and location it was last seen with, so a later scrape can tell
+    joiners, leavers and headline changes apart from people that haven't changed.
+
+    Parameters:
+        root (str): Cache folder the index is kept in.
+
+    """
+    def __init__(self, root=CACHE_ROOT):
+        os.makedirs(root, exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(root, "employee_index.sqlite3"), check_same_thread=False)
+        with self.db:
+            self.db.execute("CREATE TABLE IF NOT EXISTS employees (company_id TEXT, urn TEXT, digest TEXT, "
+                            "name TEXT, headline TEXT, location TEXT, first_seen REAL, last_seen REAL, left REAL, "
+                            "PRIMARY KEY (company_id, urn))")
+            self.db.execute("CREATE TABLE IF NOT EXISTS snapshots (company_id TEXT, taken REAL, headcount INTEGER, "
+                            "seen INTEGER, joiners INTEGER, leavers INTEGER, changed INTEGER, complete INTEGER)")
+
+    def observe(self, company_id, employees, now):
+        """
+        Record a page of employees as seen, and find which of them are new or changed.
+
+        Parameters:
+            company_id (str): The LinkedIn company ID.
+            employees (list): Employees of one page, as returned by get_employees.
+            now (float): Time the scrape started, everyone seen in the scrape gets the same time.
+
+        Returns:
+            list: One change per employee, "joined", "changed" or "" for a known, unchanged employee.
+
+        """
+        company_id = str(company_id)
+        changes = []
+        with self.lock, self.db:
+            for emp in employees:
+                urn = emp.urn
+                if not urn:
+                    # a result without a urn can't be matched to the next scrape, so it isn't indexed
+                    changes.append("")
+                    continue
+                digest = employee_digest(emp)
+                row = self.db.execute("SELECT digest, left, first_seen FROM employees WHERE company_id = ? AND urn = ?",
+                                      (company_id, urn)).fetchone()
+                # first seen in this same scrape means the page is fetched again after a resume
+                if row is None or row[1] is not None or row[2] == now:
+                    changes.append("joined")
+                elif row[0] != digest:
+                    changes.append("changed")
+                else:
+                    changes.append("")
+                self.db.execute("INSERT INTO employees (company_id, urn, digest, name, headline, location, first_seen, "
+                                "last_seen, left) VALUES (?, ?, ?, ?, ?, ?, ?, ?, NULL) "
+                                "ON CONFLICT (company_id, urn) DO UPDATE SET digest = excluded.digest, "
+                                "name = excluded.name, headline = excluded.headline, location = excluded.location, "
+                                "last_seen = excluded.last_seen, left = NULL",
+                                (company_id, urn, digest, emp.title, emp.primarySubtitle, emp.secondarySubtitle,
+                                 now, now))
+        return changes
+
+    def mark_leavers(self, company_id, since):
+        """
+        Mark everyone not seen since a time as having left, only valid after a scrape that saw the whole company.
+
+        Parameters:
+            company_id (str): The LinkedIn company ID.
+            since (float): Time the scrape started.
+
+        Returns:
+            list: The leavers, as Employee records.
+
+        """
+        with self.lock, self.db:
+            rows = self.db.execute("SELECT urn, name, headline, location FROM employees "
+                                   "WHERE company_id = ? AND last_seen < ? AND left IS NULL",
+                                   (str(company_id), since)).fetchall()
+            self.db.execute("UPDATE employees SET left = ? WHERE company_id = ? AND last_seen < ? AND left IS NULL",
+                            (time.time(), str(company_id), since))
+        return [Employee(name, urn, headline, location) for urn, name, headline, location in rows]
+
+    def current_urns(self, company_id):
+        """
+        Get the profile urns of everyone currently at a company, in the order they were first seen.
+
+        """
+        rows = self.db.execute("SELECT urn FROM employees WHERE company_id = ? AND left IS NULL "
+                               "ORDER BY first_seen, rowid", (str(company_id),)).fetchall()
+        return [row[0] for row in rows]
+
+    def record_snapshot(self, company_id, taken, headcount, seen, joiners, leavers, changed, complete):
+        with self.lock, self.db:
+            self.db.execute("INSERT INTO snapshots (company_id, taken, headcount, seen, joiners, leavers, changed, "
+                            "complete) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                            (str(company_id), taken, headcount, seen, joiners, leavers, changed, int(complete)))
+
+    def headcount_history(self, company_id):
+        """
+        Get the snapshot history of a company, oldest first.
+
+        Parameters:
+            company_id (str): The LinkedIn company ID.
+
+        Returns:
+            list: One dictionary per scrape with the time it was taken, LinkedIn's headcount, how many people
+            were seen, and the number of joiners, leavers and changed headlines.
+
+        """
+        rows = self.db.execute("SELECT taken, headcount, seen, joiners, leavers, changed, complete FROM snapshots "
+                               "WHERE company_id = ? ORDER BY taken", (str(company_id),)).fetchall()
+        keys = ("taken", "headcount", "seen", "joiners", "leavers", "changed", "complete")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def close(self):
+        self.db.close()
+
+
+class DeltaScan:
+    """
+    Tracks one scrape of a company against its EmployeeIndex.
+
+    Every page is recorded in the index. With only_changes=True, pages are cut down to joiners and changed
+    headlines, and the scan is done once stop_after pages in a row had nothing new on them, unless the company's
+    headcount went down since the last scrape, then the whole company is paged through to find the leavers.
+
+    Parameters:
+        index (EmployeeIndex): The employee index.
+        company_id (str): The LinkedIn company ID.
+        only_changes (bool): Delta mode, only pass on joiners and changed employees.
+        stop_after (int): Number of pages in a row with only known, unchanged employees before the scan is done.
+        started (float): Time the scrape started, pass the original start time when resuming a scrape.
+
+    """
+    def __init__(self, index, company_id, only_changes=False, stop_after=3, started=None):
+        self.index = index
+        self.company_id = company_id
+        self.only_changes = only_changes
+        self.stop_after = stop_after
+        self.started = started or time.time()
+        self.unchanged_pages = 0
+        self.seen = 0
+        self.joiners = 0
+        self.changed = 0
+        history = index.headcount_history(company_id)
+        self.last_headcount = history[-1]["headcount"] if history else None
+        self.headcount = None  # LinkedIn's total for this scrape, set once the first page is in
+
+    @property
+    def done(self):
+        shrinking = (self.headcount is not None and self.last_headcount is not None
+                     and self.headcount < self.last_headcount)
+        return self.only_changes and not shrinking and self.unchanged_pages >= self.stop_after
+
+    def counters(self):
+        return {"seen": self.seen, "joiners": self.joiners, "changed": self.changed,
+                "unchanged_pages": self.unchanged_pages}
+
+    def restore(self, counters):
+        """
+        Pick up the counters of an interrupted scan, as checkpointed in its run manifest, when resuming.
+
+        """
+        for key, value in (counters or {}).items():
+            setattr(self, key, value)
+
+    def filter_page(self, employees):
+        """
+        Record a page in the index and get the employees to write.
+
+        Parameters:
+            employees (list): Employees of one page, as returned by get_employees.
+
+        Returns:
+            tuple: (employees, changes), every employee with "" changes, or only joiners and changed
+            employees in delta mode.
+
+        """
+        changes = self.index.observe(self.company_id, employees, self.started)
+        self.seen += len(employees)
+        self.joiners += changes.count("joined")
+        self.changed += changes.count("changed")
+        if employees and not any(changes):
+            self.unchanged_pages += 1
+        else:
+            self.unchanged_pages = 0
+
+        if not self.only_changes:
+            return employees, changes
+        kept = [(emp, change) for emp, change in zip(employees, changes) if change]
+        return [emp for emp, _ in kept], [change for _, change in kept]
+
+    def finish(self, headcount, complete):
+        """
+        Record the snapshot of this scrape, and find the leavers if the scrape saw the whole company.
+
+        Leavers are marked in both modes, like joiners and changes every scrape moves the index on, so the next
+        delta scrape reports what changed since this one. A normal scrape's csv is the whole company, so its
+        leavers are only counted, a delta scrape writes them.
+
+        Parameters:
+            headcount (int): LinkedIn's total for the company.
+            complete (bool): Whether every employee was paged through, leavers can only be found if so.
+
+        Returns:
+            list: The leavers, as Employee records, empty if the scrape wasn't complete.
+
+        """
+        leavers = self.index.mark_leavers(self.company_id, self.started) if complete else []
+        self.index.record_snapshot(self.company_id, self.started, headcount, self.seen, self.joiners, len(leavers),
+                                   self.changed, complete)
+        return leavers
@@ -0,0 +1,161 @@
+import sys
+
+# the only fields of each search result the scraper uses, in the order they are stored in a projected page
+EMPLOYEE_FIELDS = ("title", "entityUrn", "primarySubtitle", "secondarySubtitle")
+
+# bump this if the layout of a projected page changes
+PAGE_FORMAT = 1
+
+
+class Employee:
+    """
+    One search result, only the fields the scraper uses.
+
+    Slotted, so an employee takes a fraction of the memory of a dictionary with the same fields, and the same
+    record goes from the page through the index and categorization to the csv and parquet writers.
+
+    Parameters:
+        title (str): Name of the employee.
+        entityUrn (str): Urn of the search result, see profile_urn.
+        primarySubtitle (str): Headline.
+        secondarySubtitle (str): Location.
+
+    """
+    __slots__ = EMPLOYEE_FIELDS
+
+    def __init__(self, title, entityUrn, primarySubtitle, secondarySubtitle):
+        self.title = title
+        self.entityUrn = entityUrn
+        self.primarySubtitle = primarySubtitle
+        # the same few locations repeat over a whole company, so keep one copy of each
+        self.secondarySubtitle = sys.intern(secondarySubtitle) if type(secondarySubtitle) == str else secondarySubtitle
+
+    @property
+    def urn(self):
+        return profile_urn(self.entityUrn)
+
+    def __eq__(self, other):
+        return isinstance(other, Employee) and all(getattr(self, key) == getattr(other, key) for key in EMPLOYEE_FIELDS)
+
+    def __repr__(self):
+        return f"Employee({', '.join(repr(getattr(self, key)) for key in EMPLOYEE_FIELDS)})"
+
+
+def get_item_key(item, keys):
+    if type(keys) == str:
+        keys = [keys]
+
+    cur = item
+    for key in keys:
+        if cur and key in cur.keys():
+            cur = cur[key]
+        else:
+            return ""
+
+    return cur
+
+
+def compile_path(*keys):
+    """
+    Precompile a path of keys into a getter, the same as get_item_key(item, keys) without walking the key list
+    on every call. Used for the paths read off every search result.
+
+    """
+    if len(keys) == 1:
+        key, = keys
+
+        def get(item):
+            return item.get(key, "") if item else ""
+    elif len(keys) == 2:
+        first, second = keys
+
+        def get(item):
+            item = item.get(first) if item else None
+            return item.get(second, "") if item else ""
+    else:
+        def get(item):
+            for key in keys:
+                if not item:
+                    return ""
+                item = item.get(key, "")
+            return item
+    return get
+
+
+# the paths of EMPLOYEE_FIELDS in a search result
+EMPLOYEE_PATHS = (compile_path("title", "text"), compile_path("entityUrn"), compile_path("primarySubtitle", "text"),
+                  compile_path("secondarySubtitle", "text"))
+TOTAL_PATH = compile_path("metadata", "totalResultCount")
+
+
+def project_page(j):
+    """
+    Project a LinkedIn search response down to the fields the scraper uses.
+
+    The nested elements/items structure is walked once here, so a cached page never has to be walked again.
+
+    Parameters:
+        j (dict): The "searchDashClustersByAll" part of a voyagerSearchDashClusters response.
+
+    Returns:
+        dict: {"format": PAGE_FORMAT, "total": total result count, "employees": one list per employee with the
+        values of EMPLOYEE_FIELDS}.
+
+    """
+    page = {"format": PAGE_FORMAT, "total": 0, "employees": []}
+    if not j:
+        return page
+
+    page["total"] = TOTAL_PATH(j) or 0
+    if not j["_type"] == "com.linkedin.restli.common.CollectionResponse":
+        return page
+
+    employees = page["employees"]
+    for it in j["elements"]:
+        if not it["_type"] == "com.linkedin.voyager.dash.search.SearchClusterViewModel":
+            continue
+
+        for it in it["items"]:
+            if not it["_type"] == "com.linkedin.voyager.dash.search.SearchItem":
+                continue
+
+            e = it["item"]["entityResult"]
+            if not e or not e["_type"] == "com.linkedin.voyager.dash.search.EntityResultViewModel":
+                continue
+
+            employees.append([path(e) for path in EMPLOYEE_PATHS])
+
+    return page
+
+
+def profile_urn(entity_urn):
+    """
+    Get the profile urn out of a search result's entityUrn, the part that is the same in every search.
+
+    ie "urn:li:fsd_entityResultViewModel:(urn:li:fsd_profile:ACoAAB,SEARCH_SRP,DEFAULT)" -> "urn:li:fsd_profile:ACoAAB",
+    or "" for a result without one.
+
+    """
+    if not entity_urn:
+        return ""
+    if "(" in entity_urn:
+        return entity_urn.split("(", 1)[1].split(",", 1)[0]
+    return entity_urn
+
+
+def is_projected(page):
+    return page.get("format") == PAGE_FORMAT
+
+
+def page_employees(page):
+    """
+    Get the employees of a projected page.
+
+    Parameters:
+        page (dict): A page from project_page.
+
+    Returns:
+        list: List of Employee records.
+
+    """
+    return [Employee(*row) for row in page["employees"]]
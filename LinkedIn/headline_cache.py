@@ -0,0 +1,116 @@
+from collections import OrderedDict
+import hashlib
+import os
+import sqlite3
+import threading
+
+
+class HeadlineCache:
+    """
+    Cache of headline -> (job title, job title) results, kept in memory and on disk between runs.
+
+    Lookups go to an in-process LRU first, then to a sqlite file. Entries are keyed by a hash of the
+    normalized headline and a version string, so changing jobs.csv (or the categorization) starts a fresh cache.
+
+    Parameters:
+        db_path (str): Path of the sqlite file, created if it does not exist.
+        version (bytes): Version of the categorization, ie the sha1 of jobs.csv.
+        max_memory (int): Max number of results kept in the in-process LRU.
+
+    """
+    def __init__(self, db_path, version=b"", max_memory=100000):
+        self.db_path = db_path
+        self.version = version
+        self.max_memory = max_memory
+        self.memory = OrderedDict()
+        # each GUI scrape runs on a new worker thread, so the connection is shared between threads
+        self.lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # several replay processes can share the file, so wait for each other's writes instead of failing
+        self.db = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS headlines (key BLOB PRIMARY KEY, job_1 TEXT, job_2 TEXT)")
+        self.db.commit()
+
+    def key(self, headline):
+        return hashlib.sha1(self.version + b"\0" + headline.encode("utf-8")).digest()
+
+    def remember(self, headline, result):
+        self.memory[headline] = result
+        self.memory.move_to_end(headline)
+        if len(self.memory) > self.max_memory:
+            self.memory.popitem(last=False)
+
+    def get_many(self, headlines):
+        """
+        Look up the results of many normalized headlines at once.
+
+        Parameters:
+            headlines (iterable): Normalized headlines, see job_categorizer.normalize_headline.
+
+        Returns:
+            dict: headline -> (job title, job title) for every headline that was cached.
+
+        """
+        with self.lock:
+            found = {}
+            missing = []
+            for headline in dict.fromkeys(headlines):
+                if headline in self.memory:
+                    self.memory.move_to_end(headline)
+                    found[headline] = self.memory[headline]
+                    self.memory_hits += 1
+                else:
+                    missing.append(headline)
+
+            # sqlite limits the number of parameters in one query, so look the rest up in chunks
+            keys = {self.key(headline): headline for headline in missing}
+            key_list = list(keys)
+            disk_hits = 0
+            for i in range(0, len(key_list), 500):
+                chunk = key_list[i:i + 500]
+                rows = self.db.execute("SELECT key, job_1, job_2 FROM headlines "
+                                       f"WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+                for key, job_1, job_2 in rows:
+                    headline = keys[key]
+                    found[headline] = (job_1, job_2)
+                    self.remember(headline, found[headline])
+                    disk_hits += 1
+
+            self.disk_hits += disk_hits
+            self.misses += len(missing) - disk_hits
+            return found
+
+    def put_many(self, results):
+        """
+        Store the results of many normalized headlines, in memory and on disk.
+
+        Parameters:
+            results (dict): headline -> (job title, job title).
+
+        """
+        with self.lock:
+            for headline, result in results.items():
+                self.remember(headline, result)
+            with self.db:
+                self.db.executemany("INSERT OR REPLACE INTO headlines (key, job_1, job_2) VALUES (?, ?, ?)",
+                                    [(self.key(headline), job_1, job_2)
+                                     for headline, (job_1, job_2) in results.items()])
+
+    def hit_rate(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+
+    def report(self):
+        return (f"headline cache: {self.hit_rate():.1%} hit rate ({self.memory_hits} memory, {self.disk_hits} disk, "
+                f"{self.misses} missed)")
+
+    def close(self):
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,144 @@
+import hashlib
+import os
+
+from headline_cache import HeadlineCache
+from job_matcher import load_job_matcher
+from job_ranker import load_job_ranker
+
+# bump this whenever categorize_job changes how it picks jobs, so cached results from before are not reused
+CATEGORIZER_VERSION = 1
+
+# headline caches already opened by this process, keyed by the absolute path of the sqlite file
+_loaded_caches = {}
+
+
+def normalize_headline(Li_job, company_name=""):
+    """
+    Normalize a headline so headlines that categorize the same way look the same.
+
+    The headline is lowercased, the company name is removed and runs of whitespace are collapsed,
+    so "Software Engineer at Google" and "software engineer at  Meta" both become "software engineer at".
+
+    Parameters:
+        Li_job (str): LinkedIn headline.
+        company_name (str): Name of the company being scraped.
+
+    Returns:
+        str: The normalized headline.
+
+    """
+    Li_job = Li_job.lower()
+    if company_name:
+        Li_job = Li_job.replace(company_name.lower(), '')
+    return " ".join(Li_job.split())
+
+
+def load_headline_cache(csv_path="jobs.csv", db_path="LI_Scraper_companies/headline_cache.sqlite3"):
+    """
+    Get the headline cache for a jobs csv, opening it at most once per process.
+
+    Parameters:
+        csv_path (str): Path to the jobs csv, its version is part of every cache key.
+        db_path (str): Path of the sqlite file the cache persists to.
+
+    Returns:
+        HeadlineCache: The cache.
+
+    """
+    key = os.path.abspath(db_path)
+    version = hashlib.sha1(load_job_matcher(csv_path).version + str(CATEGORIZER_VERSION).encode()).digest()
+    cache = _loaded_caches.get(key)
+    if cache is None or cache.version != version or not os.path.exists(db_path):
+        # the cache file may have been deleted by "Clear Cache" since it was opened
+        if cache is not None:
+            cache.close()
+        cache = HeadlineCache(db_path, version)
+        _loaded_caches[key] = cache
+    return cache
+
+
+def top_jobs(Li_job, job_matcher, job_ranker):
+    """
+    Get the 2 best scoring jobs of a normalized headline, raising if categorizing fails. See categorize_job.
+
+    """
+    # one scan of the headline finds every job in it, jobs that are substrings of another found job are dropped
+    # the jobs left are scored on the words they share with the headline (bm25), jobs only found inside
+    # another word (ie "cook" in "facebook") share no words and are dropped
+    possible_jobs = job_ranker.score_jobs(Li_job, job_matcher.best_jobs(Li_job))
+
+    # get two highest
+    if len(possible_jobs) > 1:
+        return possible_jobs[0][0], possible_jobs[1][0]
+    elif len(possible_jobs) == 1:
+        return possible_jobs[0][0], ""
+    else:
+        return "Role undetected", ""
+
+
+def categorize_job(Li_job, job_matcher, job_ranker, company_name=""):
+    """
+    Categorizes a LinkedIn job headline based on a very large list of predefined job roles.
+
+    Parameters:
+    - LI_job (str): LinkedIn job headline to be categorized, lowercase.
+    - job_matcher (JobMatcher): Matcher for the list of jobs in jobs.csv, used for comparison.
+    - job_ranker (JobRanker): Word index over the same list of jobs, used to score the matched jobs.
+    - company_name (str): Name of the company being scraped, removed from the headline first.
+
+    Returns:
+    - tuple str: The categorized jobs with the 2 highest scores based on matching words,
+           or "Role undetected" if no matching category is found.
+    """
+    try:
+        # first remove company name from Li_job
+        if company_name.lower() in Li_job:
+            Li_job = Li_job.replace(company_name.lower(), '')
+        return top_jobs(Li_job, job_matcher, job_ranker)
+    except Exception as e:
+        print(e)
+        print(Li_job)
+        return "Role undetected", ""
+
+
+def categorize_batch(headlines, company_name="", csv_path="jobs.csv", cache=None):
+    """
+    Categorize a whole list of headlines, in this process.
+
+    Headlines are normalized first and looked up in the cache if one is given, each distinct headline
+    that is not cached is categorized once, and only headlines that categorized without an error are cached.
+    Categorizing keeps up with pages faster than LinkedIn or the page cache hands them out, so there is no
+    process pool, replay spreads companies over processes instead.
+
+    Parameters:
+        headlines (list): LinkedIn headlines.
+        company_name (str): Name of the company being scraped, removed from each headline first.
+        csv_path (str): Path to the jobs csv.
+        cache (HeadlineCache): Cache of earlier results, see load_headline_cache.
+
+    Returns:
+        list: (job title, job title) tuples, in the same order as headlines.
+
+    """
+    normalized = [normalize_headline(headline, company_name) for headline in headlines]
+    known = cache.get_many(normalized) if cache is not None else {}
+    # dict.fromkeys keeps one copy of each headline, in order
+    todo = [headline for headline in dict.fromkeys(normalized) if headline not in known]
+    job_matcher = load_job_matcher(csv_path)
+    job_ranker = load_job_ranker(csv_path)
+    new_results = {}
+    failed = {}
+    for headline in todo:
+        try:
+            new_results[headline] = top_jobs(headline, job_matcher, job_ranker)
+        except Exception as e:
+            # not cached, so a one-off failure doesn't label the headline in every later run
+            print(e)
+            print(headline)
+            failed[headline] = ("Role undetected", "")
+
+    if cache is not None and new_results:
+        cache.put_many(new_results)
+    known.update(new_results)
+    known.update(failed)
+    return [known[headline] for headline in normalized]
@@ -0,0 +1,332 @@
+from array import array
+from collections import deque
+import csv
+import hashlib
+import mmap
+import os
+import struct
+import sys
+
+# header of the compiled index file: magic, sha1 of the jobs.csv it was built from, then byte sizes of each section
+INDEX_MAGIC = b"JOBIDX01"
+INDEX_HEADER = struct.Struct("<8s20s7Q")
+
+# matchers already loaded by this process, keyed by the absolute path of the csv
+_loaded_matchers = {}
+
+
+class JobMatcher:
+    """
+    Aho-Corasick automaton built once over the list of job titles from jobs.csv.
+
+    A headline is scanned a single time and every job title that occurs in it is reported,
+    instead of running `job in headline` for each of the ~73k titles.
+    The trie is stored in flat arrays (not one dict per node) to keep the full title list small in memory.
+
+    Parameters:
+        job_list (list): List of job titles, ie the rows of jobs.csv.
+
+    """
+    def __init__(self, job_list):
+        # dict.fromkeys drops duplicate titles but keeps the order of the csv
+        self.jobs = list(dict.fromkeys(job_list))
+        self.version = None
+        self.build()
+
+    @classmethod
+    def from_index(cls, index_path, version=None):
+        """
+        Load a matcher from a compiled index file written by `save`.
+
+        The file is memory-mapped and the automaton arrays are read straight out of the mapping,
+        so loading does not depend on the size of the title list.
+
+        Parameters:
+            index_path (str): Path to the compiled index file.
+            version (bytes): If given, the sha1 of jobs.csv the index must have been built from.
+
+        Returns:
+            JobMatcher: The loaded matcher, or None if the file is missing, invalid or out of date.
+
+        """
+        if not os.path.exists(index_path):
+            return None
+        with open(index_path, "rb") as f:
+            try:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # empty file
+                return None
+        if len(mm) < INDEX_HEADER.size:
+            return None
+        magic, digest, *sizes = INDEX_HEADER.unpack_from(mm)
+        if magic != INDEX_MAGIC or (version is not None and digest != version):
+            return None
+        if len(mm) != INDEX_HEADER.size + sum(sizes):
+            return None
+
+        view = memoryview(mm)
+        sections = []
+        offset = INDEX_HEADER.size
+        for size in sizes:
+            sections.append(view[offset:offset + size])
+            offset += size
+        jobs_blob, first_edge, edge_char, edge_next, fail, out_link, pattern_at = sections
+
+        self = cls.__new__(cls)
+        self.jobs = bytes(jobs_blob).decode("utf-8").rstrip("\0").split("\n")
+        self.first_edge = first_edge.cast("i")
+        self.edge_char = edge_char.cast("I")
+        self.edge_next = edge_next.cast("i")
+        self.fail = fail.cast("i")
+        self.out_link = out_link.cast("i")
+        self.pattern_at = pattern_at.cast("i")
+        self.root = {self.edge_char[edge]: self.edge_next[edge] for edge in range(self.first_edge[0], self.first_edge[1])}
+        self.version = digest
+        self._mmap = mm  # keeps the mapping alive as long as the matcher
+        return self
+
+    def save(self, index_path, version=b""):
+        """
+        Write the automaton to a compiled index file that can be memory-mapped by `from_index`.
+
+        The file is written to a temporary name and moved into place, so a reader never sees half of it.
+
+        Parameters:
+            index_path (str): Path to write the compiled index to.
+            version (bytes): sha1 of the jobs.csv the matcher was built from.
+
+        """
+        jobs_blob = "\n".join(self.jobs).encode("utf-8")
+        jobs_blob += b"\0" * (-len(jobs_blob) % 4)  # keep the arrays after it 4 byte aligned
+        sections = [jobs_blob] + [bytes(arr) for arr in (self.first_edge, self.edge_char, self.edge_next,
+                                                           self.fail, self.out_link, self.pattern_at)]
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, version, *[len(section) for section in sections]))
+            for section in sections:
+                f.write(section)
+        os.replace(tmp_path, index_path)
+
+    def build(self):
+        # plain trie first, one dict of children per node
+        children = [{}]
+        pattern_at = [-1]
+        for job_id, job in enumerate(self.jobs):
+            node = 0
+            for char in job:
+                nxt = children[node].get(char)
+                if nxt is None:
+                    nxt = len(children)
+                    children[node][char] = nxt
+                    children.append({})
+                    pattern_at.append(-1)
+                node = nxt
+            pattern_at[node] = job_id
+
+        # breadth first pass for the failure links and the output links
+        # out_link points at the next node down the failure chain that ends a job title
+        fail = [0] * len(children)
+        out_link = [-1] * len(children)
+        queue = deque(children[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, nxt in children[node].items():
+                f = fail[node]
+                while f and char not in children[f]:
+                    f = fail[f]
+                if node != 0:
+                    f = children[f].get(char, 0)
+                fail[nxt] = f
+                out_link[nxt] = f if pattern_at[f] >= 0 else out_link[f]
+                queue.append(nxt)
+
+        # flatten the children dicts into edge arrays, node n owns edges first_edge[n]:first_edge[n + 1]
+        first_edge = array('i', [0])
+        edge_char = array('I')
+        edge_next = array('i')
+        for node_children in children:
+            for char, nxt in node_children.items():
+                edge_char.append(ord(char))
+                edge_next.append(nxt)
+            first_edge.append(len(edge_next))
+
+        # the root is visited on almost every char, so it keeps a dict for quick lookups
+        self.root = {ord(char): nxt for char, nxt in children[0].items()}
+        self.first_edge = first_edge
+        self.edge_char = edge_char
+        self.edge_next = edge_next
+        self.fail = array('i', fail)
+        self.out_link = array('i', out_link)
+        self.pattern_at = array('i', pattern_at)
+
+    def iter_matches(self, text):
+        """
+        Scan text once and yield every job title occurrence.
+
+        Parameters:
+            text (str): The text to scan, normally a lowercase LinkedIn headline.
+
+        Returns:
+            generator: (end index, job id) tuples, the job title is self.jobs[job id].
+
+        """
+        root = self.root
+        first_edge = self.first_edge
+        edge_char = self.edge_char
+        edge_next = self.edge_next
+        fail = self.fail
+        out_link = self.out_link
+        pattern_at = self.pattern_at
+
+        node = 0
+        for end, char in enumerate(text):
+            c = ord(char)
+            while True:
+                if node == 0:
+                    node = root.get(c, 0)
+                    break
+                nxt = -1
+                for edge in range(first_edge[node], first_edge[node + 1]):
+                    if edge_char[edge] == c:
+                        nxt = edge_next[edge]
+                        break
+                if nxt >= 0:
+                    node = nxt
+                    break
+                node = fail[node]
+
+            hit = node if pattern_at[node] >= 0 else out_link[node]
+            while hit >= 0:
+                yield end, pattern_at[hit]
+                hit = out_link[hit]
+
+    def find_jobs(self, text):
+        """
+        Get the ids of every job title that occurs anywhere in text.
+
+        Parameters:
+            text (str): The text to scan.
+
+        Returns:
+            set: Job ids, indexes into self.jobs.
+
+        """
+        return {job_id for _, job_id in self.iter_matches(text)}
+
+    def best_jobs(self, text):
+        """
+        Get the job titles found in text that are not a substring of another found title.
+
+        ie for "senior software engineer" this returns "senior software engineer" but not "software engineer"
+        or "engineer". Titles are returned in the same order they appear in jobs.csv.
+
+        Parameters:
+            text (str): The text to scan.
+
+        Returns:
+            list: Job titles.
+
+        """
+        found = self.find_jobs(text)
+        # a found title that contains other found titles is scanned to find them, this stays linear
+        # in the length of the titles instead of comparing every pair
+        nested = set()
+        for job_id in found:
+            for _, sub_id in self.iter_matches(self.jobs[job_id]):
+                if sub_id != job_id:
+                    nested.add(sub_id)
+        return [self.jobs[job_id] for job_id in sorted(found - nested)]
+
+
+def read_csv(file_path):
+    data_list = []
+    with open(file_path, 'r') as csv_file:
+        csv_reader = csv.reader(csv_file)
+        for row in csv_reader:
+            # Assuming each row has only one element
+            data_list.append(row[0])
+    return data_list
+
+
+def file_version(file_path):
+    """
+    Get the version of a jobs csv, the sha1 of its contents.
+
+    Parameters:
+        file_path (str): Path to the csv.
+
+    Returns:
+        bytes: The sha1 digest.
+
+    """
+    with open(file_path, "rb") as f:
+        return hashlib.sha1(f.read()).digest()
+
+
+def default_index_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".idx"
+
+
+def build_job_index(csv_path="jobs.csv", index_path=None):
+    """
+    Build the automaton from a jobs csv and write it to its compiled index file.
+
+    Parameters:
+        csv_path (str): Path to the jobs csv.
+        index_path (str): Path to write the index to, defaults to the csv path with an .idx extension.
+
+    Returns:
+        JobMatcher: The freshly built matcher.
+
+    """
+    index_path = index_path or default_index_path(csv_path)
+    matcher = JobMatcher(read_csv(csv_path))
+    matcher.version = file_version(csv_path)
+    matcher.save(index_path, matcher.version)
+    return matcher
+
+
+def load_job_matcher(csv_path="jobs.csv", index_path=None):
+    """
+    Get the job matcher for a jobs csv, loading it at most once per process.
+
+    The compiled index next to the csv is memory-mapped if it was built from the current contents of the csv.
+    If the index is missing or the csv has changed since it was built, the index is rebuilt first.
+
+    Parameters:
+        csv_path (str): Path to the jobs csv.
+        index_path (str): Path of the compiled index, defaults to the csv path with an .idx extension.
+
+    Returns:
+        JobMatcher: The matcher for the csv.
+
+    """
+    key = os.path.abspath(csv_path)
+    if key in _loaded_matchers:
+        return _loaded_matchers[key]
+
+    index_path = index_path or default_index_path(csv_path)
+    version = file_version(csv_path)
+    matcher = JobMatcher.from_index(index_path, version)
+    if matcher is None:
+        print(f"[load_job_matcher()]: Building job index \"{index_path}\" from \"{csv_path}\".")
+        matcher = JobMatcher(read_csv(csv_path))
+        matcher.version = version
+        try:
+            matcher.save(index_path, version)
+        except OSError as e:
+            # a read only install (ie a frozen app) still works, it just rebuilds every run
+            print(f"[load_job_matcher()]: Could not save job index: {e}")
+
+    _loaded_matchers[key] = matcher
+    return matcher
+
+
+if __name__ == "__main__":
+    # build the compiled index and ranker at packaging time, ie python job_matcher.py path/to/jobs.csv
+    from job_ranker import build_job_ranker, default_rank_path
+
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else "jobs.csv"
+    build_job_index(csv_path)
+    build_job_ranker(csv_path)
+    print(f"Built \"{default_index_path(csv_path)}\" and \"{default_rank_path(csv_path)}\" from \"{csv_path}\".")
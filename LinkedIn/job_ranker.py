@@ -0,0 +1,284 @@
+from array import array
+import math
+import mmap
+import os
+import re
+import struct
+
+from job_matcher import load_job_matcher
+
+# words are runs of letters and digits, + # & are kept inside a word for titles like "c++ developer" or "r&d manager"
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#&]*")
+
+# header of the compiled ranker file: magic, sha1 of the jobs.csv it was built from, candidate_limit,
+# then byte sizes of each section, the same versioning as the matcher's jobs.idx
+RANK_MAGIC = b"JOBRNK01"
+RANK_HEADER = struct.Struct("<8s20sI4Q")
+
+# rankers already built by this process, keyed by the absolute path of the csv
+_loaded_rankers = {}
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class JobRanker:
+    """
+    Inverted index from words to job titles, with BM25 scoring of titles against a headline.
+
+    Titles with rare words in common with the headline score higher than ones that only share common words,
+    and shorter titles score higher than long ones that match the same words.
+    The postings of every word are kept in flat arrays, best title first, so they can be saved to a compiled
+    file and memory-mapped back like the matcher's index.
+
+    Parameters:
+        job_list (list): List of job titles, ie JobMatcher.jobs. Job ids are indexes into this list.
+        k1 (float): BM25 term frequency saturation.
+        b (float): BM25 length normalization.
+        candidate_limit (int): How many of the best titles per word are considered by `rank`.
+
+    """
+    def __init__(self, job_list, k1=1.2, b=0.75, candidate_limit=128):
+        self.jobs = list(job_list)
+        self.candidate_limit = candidate_limit
+
+        term_counts = []
+        postings = {}
+        for job_id, job in enumerate(self.jobs):
+            counts = {}
+            for token in tokenize(job):
+                counts[token] = counts.get(token, 0) + 1
+            term_counts.append(counts)
+            for token in counts:
+                postings.setdefault(token, []).append(job_id)
+
+        lengths = [sum(counts.values()) for counts in term_counts]
+        avg_length = sum(lengths) / max(len(lengths), 1)
+        n = len(self.jobs)
+
+        # the postings of token i are job_ids[starts[i]:starts[i + 1]] with their bm25 weights, best first
+        starts = array("q", [0])
+        job_ids = array("i")
+        weights = array("d")
+        for token, token_job_ids in postings.items():
+            idf = math.log(1 + (n - len(token_job_ids) + 0.5) / (len(token_job_ids) + 0.5))
+            token_weights = {}
+            for job_id in token_job_ids:
+                tf = term_counts[job_id][token]
+                norm = k1 * (1 - b + b * lengths[job_id] / avg_length)
+                token_weights[job_id] = idf * tf * (k1 + 1) / (tf + norm)
+            for job_id, weight in sorted(token_weights.items(), key=lambda item: (-item[1], item[0])):
+                job_ids.append(job_id)
+                weights.append(weight)
+            starts.append(len(job_ids))
+        self.set_postings(list(postings), starts, job_ids, weights)
+
+    def set_postings(self, tokens, starts, job_ids, weights):
+        self.ids = {job: job_id for job_id, job in enumerate(self.jobs)}
+        self.tokens = {token: index for index, token in enumerate(tokens)}
+        self.starts = starts
+        self.job_ids = job_ids
+        self.posting_weights = weights
+        # token -> {job id: bm25 weight}, built the first time a headline has the token
+        self.weights = {}
+
+    @classmethod
+    def from_index(cls, index_path, job_list, version=None):
+        """
+        Load a ranker from a compiled file written by `save`.
+
+        The file is memory-mapped and the postings are read straight out of the mapping, a word's postings
+        are only turned into a dict the first time a headline has that word.
+
+        Parameters:
+            index_path (str): Path to the compiled ranker file.
+            job_list (list): List of job titles the ranker was built from, ie JobMatcher.jobs.
+            version (bytes): If given, the sha1 of jobs.csv the file must have been built from.
+
+        Returns:
+            JobRanker: The loaded ranker, or None if the file is missing, invalid or out of date.
+
+        """
+        if not os.path.exists(index_path):
+            return None
+        with open(index_path, "rb") as f:
+            try:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # empty file
+                return None
+        if len(mm) < RANK_HEADER.size:
+            return None
+        magic, digest, candidate_limit, *sizes = RANK_HEADER.unpack_from(mm)
+        if magic != RANK_MAGIC or (version is not None and digest != version):
+            return None
+        if len(mm) != RANK_HEADER.size + sum(sizes):
+            return None
+
+        view = memoryview(mm)
+        sections = []
+        offset = RANK_HEADER.size
+        for size in sizes:
+            sections.append(view[offset:offset + size])
+            offset += size
+        weights, starts, job_ids, tokens_blob = sections
+
+        self = cls.__new__(cls)
+        self.jobs = list(job_list)
+        self.candidate_limit = candidate_limit
+        self.set_postings(bytes(tokens_blob).decode("utf-8").split("\n") if len(tokens_blob) else [],
+                          starts.cast("q"), job_ids.cast("i"), weights.cast("d"))
+        self.mm = mm  # kept open for as long as the arrays point into it
+        return self
+
+    def save(self, index_path, version=b""):
+        """
+        Write the postings to a compiled file that can be memory-mapped by `from_index`.
+
+        The file is written to a temporary name and moved into place, so a reader never sees half of it.
+
+        Parameters:
+            index_path (str): Path to write the compiled ranker to.
+            version (bytes): sha1 of the jobs.csv the ranker was built from.
+
+        """
+        # the 8 byte arrays go first so every section stays aligned
+        sections = [bytes(self.posting_weights), bytes(self.starts), bytes(self.job_ids),
+                    "\n".join(self.tokens).encode("utf-8")]
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(RANK_HEADER.pack(RANK_MAGIC, version, self.candidate_limit,
+                                     *[len(section) for section in sections]))
+            for section in sections:
+                f.write(section)
+        os.replace(tmp_path, index_path)
+
+    def token_weights(self, token):
+        weights = self.weights.get(token)
+        if weights is None:
+            index = self.tokens[token]
+            start, end = self.starts[index], self.starts[index + 1]
+            weights = self.weights[token] = dict(zip(self.job_ids[start:end], self.posting_weights[start:end]))
+        return weights
+
+    def query_weights(self, text):
+        return [self.token_weights(token) for token in set(tokenize(text)) if token in self.tokens]
+
+    def score_job_ids(self, text, job_ids):
+        """
+        Score the given jobs against text.
+
+        Parameters:
+            text (str): Text to score against, normally a LinkedIn headline.
+            job_ids (iterable): Job ids to score.
+
+        Returns:
+            list: (job title, score) tuples, best first. Jobs with no word in common with the text are left out.
+
+        """
+        query = self.query_weights(text)
+        scored = []
+        for job_id in job_ids:
+            score = 0.0
+            for weights in query:
+                score += weights.get(job_id, 0.0)
+            if score > 0:
+                scored.append((score, job_id))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [(self.jobs[job_id], score) for score, job_id in scored]
+
+    def score_jobs(self, text, jobs):
+        """
+        Score the given job titles against text.
+
+        Parameters:
+            text (str): Text to score against, normally a LinkedIn headline.
+            jobs (iterable): Job titles to score, ie the output of JobMatcher.best_jobs.
+
+        Returns:
+            list: (job title, score) tuples, best first. Titles with no word in common with the text,
+            like "cook" found inside "facebook", are left out.
+
+        """
+        return self.score_job_ids(text, [self.ids[job] for job in jobs if job in self.ids])
+
+    def rank(self, text, k=2):
+        """
+        Get the k best scoring job titles for text out of the whole title list.
+
+        Only the best `candidate_limit` titles of each word in the text are considered, which keeps words
+        shared by thousands of titles (like "manager") from making a lookup slow.
+
+        Parameters:
+            text (str): Text to rank titles for, normally a LinkedIn headline.
+            k (int): Number of titles to return.
+
+        Returns:
+            list: Up to k (job title, score) tuples, best first.
+
+        """
+        candidates = set()
+        for token in set(tokenize(text)):
+            index = self.tokens.get(token)
+            if index is not None:
+                start = self.starts[index]
+                candidates.update(self.job_ids[start:min(self.starts[index + 1], start + self.candidate_limit)])
+        return self.score_job_ids(text, candidates)[:k]
+
+
+def default_rank_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".rank"
+
+
+def build_job_ranker(csv_path="jobs.csv", index_path=None):
+    """
+    Build the ranker for a jobs csv and write it to its compiled file, next to the matcher's jobs.idx.
+
+    Parameters:
+        csv_path (str): Path to the jobs csv.
+        index_path (str): Path to write the ranker to, defaults to the csv path with a .rank extension.
+
+    Returns:
+        JobRanker: The freshly built ranker.
+
+    """
+    matcher = load_job_matcher(csv_path)
+    ranker = JobRanker(matcher.jobs)
+    ranker.save(index_path or default_rank_path(csv_path), matcher.version)
+    return ranker
+
+
+def load_job_ranker(csv_path="jobs.csv", index_path=None):
+    """
+    Get the job ranker for a jobs csv, loading it at most once per process.
+
+    The ranker shares job ids with the matcher returned by `load_job_matcher` for the same csv. The compiled
+    file next to the csv is memory-mapped if it was built from the current contents of the csv, otherwise
+    the ranker is built and the file written again.
+
+    Parameters:
+        csv_path (str): Path to the jobs csv.
+        index_path (str): Path of the compiled ranker, defaults to the csv path with a .rank extension.
+
+    Returns:
+        JobRanker: The ranker for the csv.
+
+    """
+    key = os.path.abspath(csv_path)
+    if key in _loaded_rankers:
+        return _loaded_rankers[key]
+
+    matcher = load_job_matcher(csv_path)
+    index_path = index_path or default_rank_path(csv_path)
+    ranker = JobRanker.from_index(index_path, matcher.jobs, matcher.version)
+    if ranker is None:
+        print(f"[load_job_ranker()]: Building job ranker \"{index_path}\" from \"{csv_path}\".")
+        ranker = JobRanker(matcher.jobs)
+        try:
+            ranker.save(index_path, matcher.version)
+        except OSError as e:
+            # a read only install (ie a frozen app) still works, it just rebuilds every run
+            print(f"[load_job_ranker()]: Could not save job ranker: {e}")
+
+    _loaded_rankers[key] = ranker
+    return ranker
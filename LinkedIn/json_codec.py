@@ -0,0 +1,38 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the standard library is used without it
+    orjson = None
+
+# name of the decoder in use, shown by the benchmark
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def loads(data):
+    """
+    Decode json, with orjson if it is installed.
+
+    Parameters:
+        data (bytes): The json, as bytes or str, ie a response body or a decompressed cache entry.
+
+    Returns:
+        The decoded object.
+
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj):
+    """
+    Encode an object as compact utf-8 json, with orjson if it is installed.
+
+    Returns:
+        bytes: The json.
+
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
@@ -0,0 +1,133 @@
+"""
+LinkedIn Scraper - Command Line
+
+Scrapes a list of companies back to back without the GUI, for servers and scheduled jobs.
+
+    python linkedin_cli.py companies.txt --output out/ --end 500 --concurrency 4
+
+The companies file has one company name per line, blank lines and lines starting with # are skipped.
+The LinkedIn login is read from --username/--password, or the LINKEDIN_USERNAME and LINKEDIN_PASSWORD
+environment variables. To spread the requests over several accounts, give --accounts a file with one
+"email password" per line, the concurrency and request rate then apply to each account.
+Companies are resolved before scraping starts, a name resolved before or with a confident match is used as is,
+otherwise the company is matched to the search result with exactly its name, or else the first result.
+
+"""
+import argparse
+import os
+import sys
+
+from metrics import profiling
+from scraper_engine import ScraperEngine
+
+
+def read_companies(path):
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith("#")]
+
+
+def read_accounts(path):
+    accounts = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            account = line.split(None, 1)
+            if len(account) != 2:
+                raise ValueError(f"{path} line {number}: expected \"email password\", got only \"{account[0]}\"")
+            accounts.append(tuple(account))
+    return accounts
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape the employees of LinkedIn companies into csv files.")
+    parser.add_argument("companies", help="file with one company name per line")
+    parser.add_argument("-o", "--output", default=".", help="directory to write the csv files to")
+    parser.add_argument("--start", type=int, default=0, help="employee to start scraping from")
+    parser.add_argument("--end", type=int, default=0, help="employee to stop scraping at, all of them if left out")
+    parser.add_argument("--concurrency", type=int, default=4, help="pages fetched at the same time, per account")
+    parser.add_argument("--rate", type=float, default=5, help="starting requests per second to LinkedIn, per account")
+    parser.add_argument("--delta", action="store_true",
+                        help="only write joiners, leavers and changed headlines since the last scrape")
+    parser.add_argument("--resume", action="store_true", help="continue unfinished scrapes of the companies")
+    parser.add_argument("--enrich", type=int, metavar="N",
+                        help="also fetch the full profiles of the first N employees of each company, 0 for all")
+    parser.add_argument("--parquet", action="store_true",
+                        help="also write a parquet dataset partitioned by company to <output>/parquet, needs pyarrow, "
+                             "delta scrapes aren't exported")
+    parser.add_argument("--jobs", default="jobs.csv", help="path to the jobs csv")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="write a json summary of the run (stage timings, pages/sec, cache hit ratio) to PATH")
+    parser.add_argument("--profile", metavar="PATH", help="profile the run with cProfile and dump the stats to PATH")
+    parser.add_argument("--username", default=os.environ.get("LINKEDIN_USERNAME", ""))
+    parser.add_argument("--password", default=os.environ.get("LINKEDIN_PASSWORD", ""))
+    parser.add_argument("--accounts", help="file with one \"email password\" per line, to use several accounts")
+    return parser.parse_args(argv)
+
+
+def scrape_all(engine, companies, args, failed):
+    try:
+        engine.auth()
+    except Exception as error:
+        # a bad password, a challenge or no connection, nothing can be scraped
+        print(f"Login failed: {type(error).__name__}: {error}", file=sys.stderr)
+        return False
+    engine.resolve_companies(companies)
+    for number, company in enumerate(companies, 1):
+        print(f"[{number}/{len(companies)}] {company}")
+        try:
+            writer = engine.scrape(company, args.output, resume=args.resume)
+            print(f"{company}: {writer.rows} employees in {writer.path}")
+            if args.enrich is not None:
+                writer = engine.enrich(company, args.output, limit=args.enrich or None)
+                print(f"{company}: {writer.rows} profiles in {writer.path}")
+        except Exception as error:
+            print(f"{company}: {type(error).__name__}: {error}")
+            failed.append(company)
+    return True
+
+
+def main(argv=None):
+    """
+    Run the scraper over every company in the companies file.
+
+    A company that fails is reported and skipped, the rest are still scraped.
+
+    Returns:
+        int: Exit code, 1 if any company failed, 2 if the accounts file is invalid or logging in failed.
+
+    """
+    args = parse_args(argv)
+    companies = read_companies(args.companies)
+    os.makedirs(args.output, exist_ok=True)
+
+    # the end value is turned into a multiple of 10 like in the GUI
+    end_val = ((args.end // 10) + 1) * 10 if args.end else sys.maxsize
+    try:
+        accounts = read_accounts(args.accounts) if args.accounts else None
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 2
+    engine = ScraperEngine(args.username, args.password, accounts=accounts, start_val=args.start, end_val=end_val,
+                           concurrency=max(1, args.concurrency), request_rate=max(0.1, args.rate),
+                           delta_mode=args.delta, csv_path=args.jobs, export_parquet=args.parquet)
+    failed = []
+    try:
+        with profiling(args.profile):
+            if not scrape_all(engine, companies, args, failed):
+                return 2
+    finally:
+        if args.metrics:
+            engine.metrics.write(args.metrics)
+            print(f"Metrics written to {args.metrics}")
+        engine.close()
+
+    if failed:
+        print(f"Failed: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,37 +4,44 @@ LinkedIn Scraper - GUI Application
 This program is a simple GUI application for scraping employee data from LinkedIn using the unofficial LinkedIn API.
 It utilizes the `linkedin_api` library for authentication and data retrieval.
 
+The scraping itself is done by ScraperEngine in scraper_engine.py, which can also run headless (see linkedin_cli.py).
+
 Created by Andrew Welling, docstrings provided by ChatGPT. fetch_employees and get_employees referenced from Tom Quirk's github
 
 """
 import tkinter as tk
 from tkinter import filedialog
 from tkinter import ttk
-from linkedin_api import Linkedin
-import os
-import requests
-import json
 import time
-import csv
+import queue
+import threading
 from pathlib import Path
 import sys
 
 from company_verifier import CompanyVerifierGUI
 from advanced_options import AdvancedSettings
+from scraper_engine import LinkedInAPIError, ScrapeCancelled, ScraperEngine
 
 # Global variables
 clicks = 0
+resume = False  # set by the resume button, continue the last unfinished scrape of the company
 status = "Not started"
 location = ""
-window = tk.Tk()
+window = None  # created in main, so worker processes importing this module don't open a window
 status_lbl = None
 company_entry = None
-company_name = ""
 location_lbl = None
-total = 0
-progress_var = tk.IntVar()
+progress_var = None
 start_val = 0
 end_val = sys.maxsize
+concurrency = 4  # pages fetched at the same time
+request_rate = 5  # starting requests per second to LinkedIn, shared by all fetch threads and adjusted as we go
+delta_mode = False  # only write joiners, leavers and changed headlines since the last scrape of the company
+engine = None
+# the scrape runs on a worker thread, which sends its status, progress and company pop-ups to the gui through events
+events = queue.Queue()
+cancel_event = threading.Event()
+POLL_MS = 50  # the gui applies the events 20 times a second, no matter how fast pages come in
 # user must input their own username and password here
 username = ''
 password = ''
@@ -44,193 +51,58 @@ def auth():
     """
     Authenticate and set up the LinkedIn API.
 
-    This function authenticates the program with the LinkedIn API using user credentials and initializes the API object.
-    It also retrieves the user's LinkedIn profile to verify successful authentication.
+    This function creates the scraper engine with the settings from the GUI, authenticates it with the LinkedIn API
+    using user credentials, and starts the scrape.
 
     """
-    global status, api
+    global status, engine
     print("Setting up")
-    updateStatus("Authenticating and securing API access...")
     try:
-        print("Auth")
-        # Add your authentication logic here
-        api = Linkedin(username, password)
-        profile = api.get_profile('andrew-welling')
-        retrieve_data()
+        engine = ScraperEngine(username, password, start_val=start_val, end_val=end_val, concurrency=concurrency,
+                               request_rate=request_rate, delta_mode=delta_mode, csv_path='jobs.csv',
+                               on_status=updateStatus, on_progress=update_progress_bar,
+                               choose_company=verify_company_gui, cancel_event=cancel_event)
+        engine.auth()
     except Exception as error:
         print(error)
         status = f"Error: {type(error).__name__}"
         updateStatus(status)
         create_crash_log(error, "auth()")
+        if engine is not None:
+            engine.close()
         reset_clicks()
+        return
+    retrieve_data()
 
 
-# the below methods are for retrieving necessary data from linkedin
-
-# this method fetches the employee data from linkedin via requests in the form of a json file
-# it uses 2 requests for every 10 users scraped
-def fetch_employees(company_id, offset=0):
-    """
-    Fetch employee data from LinkedIn using the unofficial API.
-
-    This function fetches employee data from LinkedIn using GraphQL requests and stores the data in a cache file.
-    It uses two requests for every 10 users scraped.
-
-    Parameters:
-        company_id (str): The LinkedIn company ID.
-        offset (int): The offset for paginating through employee data.
-
-    Returns:
-        dict: The JSON response containing employee data.
-
-    """
-    cache = f"LI_Scraper_companies/{company_id}/employees_{offset}.json"
-    if os.path.exists(cache):
-        r = json.loads(open(cache).read())
-        print(f"[get_employees()]: OK! Using cached file \"{cache}\".")
-
-    else:
-        uri = f"/graphql?includeWebMetadata=true&variables=(start:{offset},origin:COMPANY_PAGE_CANNED_SEARCH,query:(flagshipSearchIntent:SEARCH_SRP,queryParameters:List((key:currentCompany,value:List({company_id})),(key:resultType,value:List(PEOPLE))),includeFiltersInResponse:false))&&queryId=voyagerSearchDashClusters.b0928897b71bd00a5a7291755dcd64f0"
-        r = api._fetch(uri)
-
-        if not r.ok:
-            updateStatus(f"Error with LinkedIn api {r.status_code} ({r.reason}")
-            print(f"Error with LinkedIn api {r.status_code} ({r.reason}")
-            reset_clicks()
-            return
-
-        print(f"[fetch_employees()]: OK! LinkedIn returned status code {r.status_code} ({r.reason})")
-        r = r.json()
-
-        # Cache request
-        os.makedirs(f"LI_Scraper_companies/{company_id}", exist_ok=True)
-        with open(cache, "w") as f:
-            json.dump(r, f)
-
-        if not r["data"]["searchDashClustersByAll"]:
-            updateStatus(f"Error with LinkedIn API " + r["errors"][0]["message"])
-            print(f"Bad json. LinkedIn returned error:", r["errors"][0]["message"])
-            os.remove(cache)
-            reset_clicks()
-            return
-
-    return r["data"]["searchDashClustersByAll"]
-
-
-# get the necessary employee data from the above json file and method
-def get_employees(company_id, offset=0):
-    global total, end_val
-    """
-    Retrieve necessary employee data from LinkedIn.
-
-    This function retrieves necessary employee data from the JSON response obtained through the LinkedIn API.
-
-    Parameters:
-        company_id (str): The LinkedIn company ID.
-        offset (int): The offset for paginating through employee data.
-
-    Returns:
-        list: List of dictionaries containing employee data.
-
+def verify_company_gui(companies, company_name=""):
     """
+    Verify the correct company using a GUI.
 
-    def get_item_key(item, keys):
-        if type(keys) == str:
-            keys = [keys]
-
-        cur = item
-        for key in keys:
-            if cur and key in cur.keys():
-                cur = cur[key]
-            else:
-                return ""
-
-        return cur
-
-    j = fetch_employees(company_id, offset=offset)
-
-    total = j["metadata"]["totalResultCount"]
-    if end_val == 0:  # this is for if the user didnt specify an end val in advanced settings
-        print("total emp: ", total)
-        end_val = total
-
-    if not j:
-        return []
-
-    if not j["_type"] == "com.linkedin.restli.common.CollectionResponse":
-        return []
-
-    employees = []
-    for it in j["elements"]:
-        if not it["_type"] == "com.linkedin.voyager.dash.search.SearchClusterViewModel":
-            continue
-
-        for it in it["items"]:
-            if not it["_type"] == "com.linkedin.voyager.dash.search.SearchItem":
-                continue
-
-            e = it["item"]["entityResult"]
-            if not e or not e["_type"] == "com.linkedin.voyager.dash.search.EntityResultViewModel":
-                continue
-
-            try:
-                # print("\nEmployee:")
-                # print("    ", get_item_key(e, ["title", "text"]))
-                # print("    ", get_item_key(e, "entityUrn"))
-                # print("    ", get_item_key(e, ["primarySubtitle", "text"]))
-                # print("    ", get_item_key(e, ["secondarySubtitle", "text"]))
-
-                employees.append({
-                    "title": get_item_key(e, ["title", "text"]),
-                    "entityUrn": get_item_key(e, "entityUrn"),
-                    "primarySubtitle": get_item_key(e, ["primarySubtitle", "text"]),
-                    "secondarySubtitle": get_item_key(e, ["secondarySubtitle", "text"]),
-                })
-            except Exception as e:
-                print(f"Error {e} when processing employees with id {company_id}")
-                updateStatus(f"Error {e} when processing employees with id {company_id}")
-                create_crash_log(e, "get_employees()")
-                reset_clicks()
-                exit(1)
-
-    return employees
-
-
-# retrieves the company's urn id from a company name
-def get_company_id_from_name(companyName):
-    """
-    Get the LinkedIn company ID from a company name.
-
-    This function searches for companies on LinkedIn based on a provided name and verifies the correct company using a GUI.
+    This runs on the worker thread, it asks the gui to show the pop-up (see show_company_verifier) and waits for the answer.
 
     Parameters:
-        company_name (str): The name of the company to search for.
+        companies (list): List of company objects.
+        company_name (str): The name that was searched for.
 
     Returns:
-        str: The LinkedIn company ID.
+        dict: The selected company object.
 
     """
-    global company_name
-    companies = api.search_companies(keywords=companyName, limit=5)
-    # verify company with gui below
-    companyObj = verify_company_gui(companies)
-    company_name = companyObj['name']
-    print(company_name)
-    print(companyObj)
-    return companyObj['urn_id']
+    reply = queue.Queue()
+    events.put(("choose", (companies, reply)))
+    return reply.get()
 
 
-def verify_company_gui(companies):
+def show_company_verifier(companies, reply):
     """
-    Verify the correct company using a GUI.
+    Show the company pop-up for the worker thread and send back the selection.
 
     This function creates a pop-up GUI window using the `CompanyVerifierGUI` class to allow the user to select the correct company.
 
     Parameters:
         companies (list): List of company objects.
-
-    Returns:
-        dict: The selected company object.
+        reply (queue.Queue): Queue the worker thread is waiting on for the selected company object.
 
     """
     verify_obj = CompanyVerifierGUI(window, companies)
@@ -240,165 +112,32 @@ def verify_company_gui(companies):
 
     selected_company = verify_obj.get_selected_object()
     print(selected_company)
-
-    if selected_company is None:
-        print(selected_company)
-        updateStatus("Restart")
-        reset_clicks()
-    else:
-        return selected_company
-
-def read_csv(file_path):
-    data_list = []
-    with open(file_path, 'r') as csv_file:
-        csv_reader = csv.reader(csv_file)
-        for row in csv_reader:
-            # Assuming each row has only one element
-            data_list.append(row[0])
-    return data_list
-
-def categorize_job(Li_job, job_list):
-    # TODO: make it so they must share the first letter of the word before starting count
-    """
-    Categorizes a LinkedIn job headline based on a very large list of predefined job roles.
-
-    Parameters:
-    - LI_job (str): LinkedIn job headline to be categorized.
-    - job_list (list): List of jobs from a dataset used for comparison.
-
-    Returns:
-    - tuple str: The categorized jobs with the 2 highest scores based on matching words,
-           or "Role undetected" if no matching category is found.
-    """
-    try:
-        # first remove company name from Li_job
-        if company_name.lower() in Li_job:
-            Li_job = Li_job.replace(company_name.lower(), '')
-
-        possible_jobs = {}
-        for job in job_list:
-            if job in Li_job:
-                # put job into dictionary to count char similarity scores
-                possible_jobs.update({job: 0})
-
-        # create a new dictionary to store non-substring values
-        filtered_jobs = {}
-
-        # iterate through the original dictionary, remove substring vals
-        for job_1 in possible_jobs:
-            is_substring = False
-            for job_2 in possible_jobs:
-                if job_1 != job_2 and job_1 in job_2:
-                    is_substring = True
-                    break
-
-            # if job_1 is not a substring of any other job, add it to the filtered dictionary
-            if not is_substring:
-                filtered_jobs[job_1] = possible_jobs[job_1]
-
-        possible_jobs = filtered_jobs
-
-        # check similarity and get two highest
-        print(possible_jobs)
-        if len(possible_jobs) != 0:
-            for job in possible_jobs:
-                for char in job:
-                    if char in Li_job:
-                        possible_jobs[job] += 1
-            possible_jobs = sorted(possible_jobs, key=possible_jobs.get, reverse=True)
-            if len(possible_jobs) > 1:
-                return possible_jobs[0], possible_jobs[1]
-            else:
-                return possible_jobs[0], ""
-        else:
-            return "Role undetected", ""
-    except Exception as e:
-        print(e)
-        print(Li_job)
+    reply.put(selected_company)
 
 
 def retrieve_data():
     """
     Retrieve data from LinkedIn and store it in a CSV file.
 
-    This function retrieves employee data from LinkedIn and stores it in a CSV file.
-    It initiates the data retrieval process and calls the `finish_up` function upon completion.
+    This function runs the scrape of the company in the engine, see ScraperEngine.scrape, and shows how it went.
+    When resuming, the last unfinished scrape of the company continues from its checkpoint in the run manifest.
 
     """
-    global status, status_lbl
-    print("Retrieving data")
-    # print("Company:", company)
-    # print("file loc:", location)
-    updateStatus("Obtaining data, may take a while")
     try:
-        # print("Scraping...")
-        # scraping and searching here
-        i = (start_val // 10) * 10  # use floor division to make the start val a multiple of 10
-        print(i)
-        print(end_val)
-        employee_lists = []
-        employees = [1]  # initialized with a value so while loop can run
-        # print(len(employees))
-        id = get_company_id_from_name(companyName=company)
-        print(id)
-        while (len(employees) != 0) and ((i + 10) <= end_val):
-            # offset is always multiples of 10, as one call scrapes 10 employees
-            # print(id)
-            employees = get_employees(id, offset=i)
-            employee_lists.append(employees)
-            i += 10
-            # update progress of prog bar
-            update_progress_bar(i)
-            print(i)
-            print(end_val)
-            time.sleep(.1)  # sleep needed to prevent rate limiting, might eliminate since taking requests takes awhile
-        # print(len(employee_lists))
-        finish_up(employee_lists)
+        engine.scrape(company, location, resume=resume)
+        updateStatus("Download Successful!")
+    except ScrapeCancelled as error:
+        print(error)
+        updateStatus("Cancelled, Resume continues it" if cancel_event.is_set() else "Restart")
+    except LinkedInAPIError as error:
+        print(error)
+        updateStatus(str(error))
     except Exception as error:
         print(error)
         updateStatus(f"Error: {type(error).__name__}")
         create_crash_log(error, "retrieve_data()")
-        reset_clicks()
-
-
-# update status and download the file
-def finish_up(employee_lists):
-    """
-    Finalize the data retrieval process and store employee data in a CSV file.
-
-    This function receives a 2D list of employees for a company, and stores the data in a CSV file.
-    The CSV file is named '{company}_linkedin_data.csv' and includes headers for "Name," "Role," and "Location."
-
-    Parameters:
-        employee_lists (list): A 2D list containing employee data for a company.
-
-    """
-    global location
-    updateStatus("Storing data to file")
-    try:
-        # download file here
-        location += f"{company}_linkedin_data.csv".replace(" ", "_")
-        directory = os.path.dirname(location)
-
-        # Create the directory if it does not exist
-        if not os.path.exists(directory):
-            os.makedirs(directory)
-
-        # location error?
-        with open(location, 'w', newline='', encoding='utf-8') as csvfile:
-            csv_writer = csv.writer(csvfile)
-            csv_writer.writerow(["Name", "Headline", "Job Title", "Job Title", "Location"])  # create header
-            for emp_list in employee_lists:
-                for emp in emp_list:
-                    jobs_cat = categorize_job(emp['primarySubtitle'].lower(), read_csv('jobs.csv'))
-                    csv_writer.writerow([emp['title'], emp['primarySubtitle'], jobs_cat[0], jobs_cat[1], emp['secondarySubtitle']])
-
-        updateStatus("Download Successful!")
-        reset_clicks()
-    except Exception as e:
-        print(e)
-        updateStatus(f"Error: {type(e).__name__}")
-        create_crash_log(e, "finish_up()")
+    finally:
+        engine.close()
         reset_clicks()
 
 
@@ -422,14 +161,85 @@ def handle_click():
     This function is called when the 'Run' button is clicked. It initiates the data retrieval process by calling the 'auth' function.
 
     """
-    global clicks, company_entry, company, progress_var
+    global clicks, company_entry, company, progress_var, resume
     # print(clicks)
     company = company_entry.get()
+    resume = False
     if clicks == 0:
+        clicks += 1
         updateStatus("Starting...")
         progress_var.set(0)
-        auth()
+        start_worker()
+
+
+def handle_resume_click():
+    """
+    Handle the 'Resume' button click.
+
+    Same as 'Run', but continues the last unfinished scrape of the company from its checkpoint, appending to its CSV.
+
+    """
+    global clicks, company, resume
+    company = company_entry.get()
+    resume = True
+    if clicks == 0:
         clicks += 1
+        updateStatus("Resuming...")
+        progress_var.set(0)
+        start_worker()
+
+
+def handle_cancel_click():
+    """
+    Handle the 'Cancel' button click.
+
+    Stops the running scrape after the page it is on, what was scraped so far is kept and can be resumed.
+
+    """
+    if clicks != 0 and not cancel_event.is_set():
+        cancel_event.set()
+        updateStatus("Cancelling...")
+
+
+def start_worker():
+    """
+    Run the scrape (auth and retrieve_data) on a worker thread, so network waits don't freeze the GUI.
+
+    """
+    cancel_event.clear()
+    threading.Thread(target=auth, daemon=True).start()
+
+
+def poll_events():
+    """
+    Apply the events from the worker thread to the GUI, called every POLL_MS by the Tk main loop.
+
+    Only the last status and progress since the last poll are shown, so the GUI does the same work
+    no matter how many pages come in.
+
+    """
+    global clicks
+    new_status = None
+    new_progress = None
+    try:
+        while True:
+            kind, value = events.get_nowait()
+            if kind == "status":
+                new_status = value
+            elif kind == "progress":
+                new_progress = value
+            elif kind == "reset":
+                clicks = 0
+            elif kind == "choose":
+                show_company_verifier(*value)
+    except queue.Empty:
+        pass
+
+    if new_status is not None:
+        status_lbl.config(text=new_status)
+    if new_progress is not None:
+        progress_var.set(new_progress * 99.9)
+    window.after(POLL_MS, poll_events)
 
 
 def create_gui():
@@ -443,7 +253,7 @@ def create_gui():
     global window, location, status_lbl, company_entry, location_lbl, progress, progress_var
 
     # Create the GUI
-    window.geometry("300x250")
+    window.geometry("300x310")
     window.title("LinkedIn Scraper")
 
     # Create field to enter company names
@@ -466,6 +276,16 @@ def create_gui():
                        command=handle_click)
     button.pack()
 
+    # Create resume button, continues an interrupted scrape
+    resume_button = tk.Button(master=window, text="Resume", width=10, height=1, bg="white", fg="black",
+                              command=handle_resume_click)
+    resume_button.pack()
+
+    # Create cancel button, stops the running scrape
+    cancel_button = tk.Button(master=window, text="Cancel", width=10, height=1, bg="white", fg="black",
+                              command=handle_cancel_click)
+    cancel_button.pack()
+
     # Create adv options button
     adv_button = tk.Button(master=window, text="Advanced Options", width=14, height=1, bg="white", fg="black",
                            command=open_advanced_options)
@@ -481,7 +301,7 @@ def create_gui():
 
 
 def open_advanced_options():
-    global start_val, end_val, username, password
+    global start_val, end_val, username, password, concurrency, request_rate, delta_mode
     """
     Advanced settings for advanced user
 
@@ -506,52 +326,51 @@ def open_advanced_options():
         print("upd end")
         end_val = ((int(settings_obj.end) // 10) + 1) * 10  # turns end val into a multiple of 10 just in case
         print("updates end to " + str(end_val))
+    if settings_obj.concurrency:
+        concurrency = max(1, int(settings_obj.concurrency))
+        print("updates concurrency to " + str(concurrency))
+    if settings_obj.rate:
+        request_rate = max(0.1, float(settings_obj.rate))
+        print("updates request rate to " + str(request_rate))
+    if settings_obj.delta is not None:
+        delta_mode = settings_obj.delta
+        print("updates delta mode to " + str(delta_mode))
 
 
 def updateStatus(newStatus):
     """
     Update the current status text in the GUI.
 
-    This function updates the status label in the GUI with a new status message.
+    This function sends a new status message to the status label, it is shown on the next poll_events.
 
     Parameters:
         newStatus (str): The new status message.
 
     """
-    global status_lbl
-    status_lbl.config(text=newStatus)
-    window.update()
+    events.put(("status", newStatus))
 
 
 def update_progress_bar(prog):
-    global progress_var
     """
     Update the current progress in the progress bar in the GUI
 
-    This function updates the progress bar in the GUI with a new value
+    This function sends a new value to the progress bar, it is shown on the next poll_events.
 
     Parameters:
-        prog (int): New progress value
+        prog (float): New progress value, from 0 to 1
 
     """
-    # print(total)
-    if prog > end_val:
-        prog = end_val
-    # print((prog / total) * 99.9)
-    progress_var.set(((prog - start_val) / (end_val - start_val)) * 99.9)
-    progress.update()
+    events.put(("progress", prog))
 
 
 def reset_clicks():
     """
     Reset the click counter to allow running the scraper again.
 
-    This function resets the global click counter to -1, enabling the 'Run' button to be clicked again.
+    This function asks the GUI to reset the global click counter to 0, enabling the 'Run' button to be clicked again.
 
     """
-    global clicks
-    clicks = -1
-    # print(clicks)
+    events.put(("reset", None))
 
 
 
@@ -579,8 +398,14 @@ def create_crash_log(error, funcName):
     print(f"File '{filename}' saved in 'crashes' folder.")
 
 
-# Call the GUI creation function
-create_gui()
+if __name__ == "__main__":
+
+    window = tk.Tk()
+    progress_var = tk.IntVar()
+
+    # Call the GUI creation function
+    create_gui()
+    window.after(POLL_MS, poll_events)
 
-# Start the main loop
-window.mainloop()
+    # Start the main loop
+    window.mainloop()
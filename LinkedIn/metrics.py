@@ -0,0 +1,107 @@
+import cProfile
+import json
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+
+def percentile(values, fraction):
+    # nearest rank, values must be sorted
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, round(fraction * len(values)) - 1))]
+
+
+class RunMetrics:
+    """
+    Timers and counters of a run, shared by every fetch thread.
+
+    Each stage keeps the duration of every call, so the summary can give percentiles, ie how long a page took
+    from LinkedIn against from the page cache, or how long categorizing a page took.
+
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.timings = defaultdict(list)
+        self.counters = Counter()
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+    def add_time(self, stage, seconds):
+        with self.lock:
+            self.timings[stage].append(seconds)
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def summary(self):
+        """
+        Summarize the run.
+
+        Returns:
+            dict: {"elapsed", "pages", "pages_per_sec", "cache_hit_ratio", "counters", "stages"}, stages has the
+            calls, total, mean, p50, p95 and max seconds of every stage.
+
+        """
+        with self.lock:
+            timings = {stage: sorted(values) for stage, values in self.timings.items()}
+            counters = dict(self.counters)
+        elapsed = time.perf_counter() - self.started
+        hits = counters.get("cache_hits", 0)
+        pages = hits + counters.get("cache_misses", 0)
+        return {
+            "elapsed": round(elapsed, 3),
+            "pages": pages,
+            "pages_per_sec": round(pages / elapsed, 2) if elapsed else 0.0,
+            "cache_hit_ratio": round(hits / pages, 4) if pages else 0.0,
+            "counters": counters,
+            "stages": {stage: {
+                "calls": len(values),
+                "total": round(sum(values), 4),
+                "mean": round(sum(values) / len(values), 6),
+                "p50": round(percentile(values, 0.5), 6),
+                "p95": round(percentile(values, 0.95), 6),
+                "max": round(values[-1], 6),
+            } for stage, values in sorted(timings.items())},
+        }
+
+    def report(self):
+        summary = self.summary()
+        stages = ", ".join(f"{stage} {values['total']:.2f}s" for stage, values in summary["stages"].items())
+        return (f"metrics: {summary['pages']} pages in {summary['elapsed']:.1f}s ({summary['pages_per_sec']}/sec), "
+                f"{summary['cache_hit_ratio']:.1%} from cache. {stages}")
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+
+
+@contextmanager
+def profiling(path=None):
+    """
+    Profile the calling thread with cProfile and dump the stats to path, does nothing without a path.
+
+    Only the calling thread is profiled, so with fetch threads the profile covers categorizing and writing,
+    the fetches show up in the RunMetrics timers. Open the dump with pstats or snakeviz.
+
+    """
+    if not path:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        print(f"Profile written to {path}")
@@ -0,0 +1,122 @@
+import csv
+import os
+import time
+
+from job_categorizer import categorize_batch
+from metrics import RunMetrics
+
+CSV_HEADER = ["Name", "Headline", "Job Title", "Job Title", "Location"]
+# delta scrapes only write joiners, leavers and changed headlines, with what happened to each in front
+DELTA_CSV_HEADER = ["Change"] + CSV_HEADER
+
+
+class EmployeeCSVWriter:
+    """
+    Streams employees to the output csv a page at a time, categorizing each page as it is written.
+
+    Nothing is kept once a page is written, so memory stays at one page no matter how big the company is,
+    and the file is flushed every few pages so a crash only loses the last few pages.
+    If a manifest is given it is checkpointed on every flush, and with resume=True the writer picks up
+    the csv where the manifest's last checkpoint left it instead of starting a new one.
+    If a DeltaScan is given every page is recorded in the employee index as it is written, and in delta mode
+    only the joiners and changed employees of each page are written.
+
+    Parameters:
+        path (str): Path of the csv to write.
+        company_name (str): Name of the company being scraped, removed from headlines before categorizing.
+        csv_path (str): Path to the jobs csv.
+        cache (HeadlineCache): Cache of earlier categorization results, see job_categorizer.load_headline_cache.
+        flush_every (int): Number of pages between flushes to disk.
+        manifest (RunManifest): Checkpoint of the scrape, updated on every flush.
+        resume (bool): Append to the csv from the manifest's last checkpoint.
+        delta (DeltaScan): Scan of the company against its employee index, see employee_index.DeltaScan.
+        exporter (EmployeeParquetWriter): Also gets every categorized page, staged on every flush, see
+            parquet_export.EmployeeParquetWriter. Publishing it is up to the caller, once the scrape finished.
+        metrics (RunMetrics): Times categorizing, writing and exporting each page, see metrics.RunMetrics.
+
+    """
+    def __init__(self, path, company_name="", csv_path="jobs.csv", cache=None, flush_every=5, manifest=None,
+                 resume=False, delta=None, exporter=None, metrics=None):
+        self.path = path
+        self.company_name = company_name
+        self.csv_path = csv_path
+        self.cache = cache
+        self.flush_every = flush_every
+        self.manifest = manifest
+        self.delta = delta
+        self.exporter = exporter
+        self.metrics = metrics if metrics is not None else RunMetrics()
+        self.only_changes = delta is not None and delta.only_changes
+        self.pages = 0
+        self.rows = 0
+        self.next_offset = manifest.next_offset if manifest is not None else 0
+
+        # Create the directory if it does not exist
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if resume:
+            # rows written after the last checkpoint belong to pages that will be fetched again, so they are cut off
+            with open(path, 'r+b') as f:
+                f.truncate(manifest.position)
+            self.rows = manifest.rows
+            self.file = open(path, 'a', newline='', encoding='utf-8')
+            self.csv_writer = csv.writer(self.file)
+        else:
+            self.file = open(path, 'w', newline='', encoding='utf-8')
+            self.csv_writer = csv.writer(self.file)
+            self.csv_writer.writerow(DELTA_CSV_HEADER if self.only_changes else CSV_HEADER)  # create header
+
+    def write_page(self, employees, next_offset=None, changes=None):
+        """
+        Categorize a page of employees and append it to the csv.
+
+        Parameters:
+            employees (list): Employees of one page, as returned by get_employees.
+            next_offset (int): Offset of the page after this one, checkpointed in the manifest.
+            changes (list): What happened to each employee, ie "left". If not given and the writer has a
+                DeltaScan, the page goes through the scan to find them.
+
+        """
+        if changes is None and self.delta is not None:
+            with self.metrics.timer("employee_index"):
+                employees, changes = self.delta.filter_page(employees)
+        with self.metrics.timer("categorize"):
+            jobs_cats = categorize_batch([emp.primarySubtitle for emp in employees], company_name=self.company_name,
+                                         csv_path=self.csv_path, cache=self.cache)
+        with self.metrics.timer("write_csv"):
+            for index, (emp, jobs_cat) in enumerate(zip(employees, jobs_cats)):
+                row = [emp.title, emp.primarySubtitle, jobs_cat[0], jobs_cat[1], emp.secondarySubtitle]
+                if self.only_changes:
+                    row.insert(0, changes[index])
+                self.csv_writer.writerow(row)
+        if self.exporter is not None:
+            with self.metrics.timer("export"):
+                self.exporter.write_page(employees, jobs_cats)
+        self.metrics.count("employees", len(employees))
+
+        self.pages += 1
+        self.rows += len(employees)
+        if next_offset is not None:
+            self.next_offset = next_offset
+        if self.pages % self.flush_every == 0:
+            self.flush()
+
+    def flush(self):
+        started = time.perf_counter()
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        if self.exporter is not None:
+            self.exporter.checkpoint(self.next_offset)
+        # only checkpoint once the rows are on disk, so the manifest never points past the end of the file
+        if self.manifest is not None:
+            if self.delta is not None:
+                self.manifest.state["delta"] = self.delta.counters()
+            self.manifest.checkpoint(self.next_offset, self.file.tell(), self.rows)
+        self.metrics.add_time("flush", time.perf_counter() - started)
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
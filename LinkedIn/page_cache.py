@@ -0,0 +1,272 @@
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import zlib
+
+from json_codec import dumps, loads
+
+CACHE_ROOT = "LI_Scraper_companies"
+
+# cache hits whose access times are held in memory before they are written anyway
+ACCESSED_BATCH = 1000
+
+
+class PageCache:
+    """
+    Cache of LinkedIn employee pages, all companies in one sqlite file per cache root.
+
+    Pages are keyed by (company id, offset) and stored zlib compressed, optionally next to the raw response
+    they were made from. Pages older than the ttl are treated
+    as missing, and once the cache is bigger than max_bytes the least recently used pages are evicted.
+    Every write is a sqlite transaction, so a crash mid write never leaves a half written page behind.
+    Reading a page only notes when it was used in memory, those times are written along with the next write.
+    Pages cached as separate json files by older versions are moved into the cache the first time they are read.
+
+    Parameters:
+        root (str): Folder the cache lives in.
+        ttl_days (float): Pages older than this many days are refetched, None to keep pages forever.
+        max_bytes (int): Max size of the stored pages, None for no limit.
+
+    """
+    def __init__(self, root=CACHE_ROOT, ttl_days=None, max_bytes=None):
+        self.root = root
+        self.ttl = ttl_days * 86400 if ttl_days else None
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()  # pages are read and written from every fetch thread
+        # (company id, offset) -> when the page was last read, written with the next put, evict or close
+        # so a cache hit doesn't need a write transaction of its own
+        self.accessed = {}
+
+        os.makedirs(root, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(root, "pages.sqlite3"), check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        with self.db:
+            self.db.execute("CREATE TABLE IF NOT EXISTS pages (company_id TEXT, offset INTEGER, data BLOB, "
+                            "size INTEGER, created REAL, accessed REAL, PRIMARY KEY (company_id, offset))")
+            self.db.execute("CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed)")
+            self.db.execute("CREATE TABLE IF NOT EXISTS companies (company_id TEXT PRIMARY KEY, name TEXT)")
+            # caches made before raw responses were kept separately don't have the column yet
+            columns = [row[1] for row in self.db.execute("PRAGMA table_info(pages)")]
+            if "raw" not in columns:
+                self.db.execute("ALTER TABLE pages ADD COLUMN raw BLOB")
+        self.total_bytes = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def legacy_path(self, company_id, offset):
+        return os.path.join(self.root, str(company_id), f"employees_{offset}.json")
+
+    def get(self, company_id, offset):
+        """
+        Get a cached page.
+
+        Parameters:
+            company_id (str): The LinkedIn company ID.
+            offset (int): The offset of the page.
+
+        Returns:
+            dict: The cached page, or None if it is not cached or is stale.
+
+        """
+        now = time.time()
+        with self.lock:
+            row = self.db.execute("SELECT data, created FROM pages WHERE company_id = ? AND offset = ?",
+                                  (str(company_id), offset)).fetchone()
+            if row is not None:
+                data, created = row
+                if self.ttl is not None and now - created > self.ttl:
+                    self.delete_rows("company_id = ? AND offset = ?", (str(company_id), offset))
+                    return None
+                self.accessed[(str(company_id), offset)] = now
+                if len(self.accessed) >= ACCESSED_BATCH:
+                    with self.db:
+                        self.write_accessed()
+                return loads(zlib.decompress(data))
+
+        legacy = self.legacy_path(company_id, offset)
+        if os.path.exists(legacy):
+            with open(legacy, 'rb') as f:
+                page = loads(f.read())
+            self.put(company_id, offset, page, created=os.path.getmtime(legacy))
+            os.remove(legacy)
+            return page
+        return None
+
+    def get_raw(self, company_id, offset):
+        """
+        Get the raw response a cached page was made from, if it was kept.
+
+        Parameters:
+            company_id (str): The LinkedIn company ID.
+            offset (int): The offset of the page.
+
+        Returns:
+            dict: The raw response, or None if it was not kept.
+
+        """
+        with self.lock:
+            row = self.db.execute("SELECT raw FROM pages WHERE company_id = ? AND offset = ?",
+                                  (str(company_id), offset)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return loads(zlib.decompress(row[0]))
+
+    def put(self, company_id, offset, page, created=None, raw=None):
+        """
+        Store a page, replacing any page already cached at the same offset.
+
+        Parameters:
+            company_id (str): The LinkedIn company ID.
+            offset (int): The offset of the page.
+            page (dict): The page to cache, must be json serializable.
+            created (float): Time the page was fetched, defaults to now.
+            raw (dict): The raw response the page was made from, only stored if given.
+
+        """
+        data = zlib.compress(dumps(page))
+        raw_data = zlib.compress(dumps(raw)) if raw is not None else None
+        size = len(data) + len(raw_data or b"")
+        now = time.time()
+        with self.lock:
+            with self.db:
+                self.write_accessed()
+                old = self.db.execute("SELECT size FROM pages WHERE company_id = ? AND offset = ?",
+                                      (str(company_id), offset)).fetchone()
+                self.db.execute("INSERT OR REPLACE INTO pages (company_id, offset, data, raw, size, created, accessed) "
+                                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                (str(company_id), offset, data, raw_data, size, created or now, now))
+            self.total_bytes += size - (old[0] if old else 0)
+            if self.max_bytes is not None and self.total_bytes > self.max_bytes:
+                self.evict()
+
+    def write_accessed(self):
+        # the caller holds the lock and has a transaction open
+        if self.accessed:
+            self.db.executemany("UPDATE pages SET accessed = ? WHERE company_id = ? AND offset = ?",
+                                [(when, company_id, offset) for (company_id, offset), when in self.accessed.items()])
+            self.accessed.clear()
+
+    def evict(self):
+        # drop least recently used pages until the cache is back under 90% of the cap, so we don't evict on every put
+        target = self.max_bytes * 0.9
+        with self.db:
+            self.write_accessed()
+        rows = self.db.execute("SELECT company_id, offset, size FROM pages ORDER BY accessed")
+        doomed = []
+        size = self.total_bytes
+        for company_id, offset, page_size in rows:
+            if size <= target:
+                break
+            doomed.append((company_id, offset))
+            size -= page_size
+        with self.db:
+            self.db.executemany("DELETE FROM pages WHERE company_id = ? AND offset = ?", doomed)
+        self.total_bytes = size
+        print(f"[PageCache]: Evicted {len(doomed)} pages to stay under {self.max_bytes} bytes")
+
+    def delete_rows(self, where, params=()):
+        with self.db:
+            size = self.db.execute(f"SELECT COALESCE(SUM(size), 0) FROM pages WHERE {where}", params).fetchone()[0]
+            count = self.db.execute(f"DELETE FROM pages WHERE {where}", params).rowcount
+        self.total_bytes -= size
+        return count
+
+    def set_company_name(self, company_id, name):
+        with self.lock:
+            with self.db:
+                self.db.execute("INSERT OR REPLACE INTO companies (company_id, name) VALUES (?, ?)",
+                                (str(company_id), name))
+
+    def find_company_ids(self, company):
+        # a company can be cleared by its id or by the name it was scraped under
+        rows = self.db.execute("SELECT company_id FROM companies WHERE company_id = ? OR LOWER(name) = LOWER(?)",
+                               (str(company), company)).fetchall()
+        return {row[0] for row in rows} | {str(company)}
+
+    def company_name(self, company_id):
+        row = self.db.execute("SELECT name FROM companies WHERE company_id = ?", (str(company_id),)).fetchone()
+        return row[0] if row else None
+
+    def cached_company_ids(self):
+        """
+        List every company with cached pages, by company id, including companies still in legacy json folders.
+
+        """
+        with self.lock:
+            rows = self.db.execute("SELECT DISTINCT company_id FROM pages").fetchall()
+        ids = {row[0].split("|", 1)[0] for row in rows}
+        if os.path.isdir(self.root):
+            ids |= {name for name in os.listdir(self.root) if name.isdigit() and os.path.isdir(os.path.join(self.root, name))}
+        return sorted(ids)
+
+    def iter_pages(self, company_id):
+        """
+        Read every cached page of a company without touching when they were last used, the pages of its whole
+        search first and then the pages of each shard, each in offset order.
+
+        Parameters:
+            company_id (str): The LinkedIn company ID.
+
+        Returns:
+            generator: (cache key, offset, page) tuples.
+
+        """
+        # pages still in a legacy json folder are moved into the cache first
+        folder = os.path.join(self.root, str(company_id))
+        if str(company_id).isdigit() and os.path.isdir(folder):
+            for name in os.listdir(folder):
+                if name.startswith("employees_") and name.endswith(".json"):
+                    self.get(company_id, int(name[len("employees_"):-len(".json")]))
+
+        with self.lock:
+            keys = self.db.execute("SELECT company_id, offset FROM pages WHERE company_id = ? OR company_id LIKE ? "
+                                   "ORDER BY company_id = ? DESC, company_id, offset",
+                                   (str(company_id), f"{company_id}|%", str(company_id))).fetchall()
+        for key, offset in keys:
+            with self.lock:
+                row = self.db.execute("SELECT data FROM pages WHERE company_id = ? AND offset = ?",
+                                      (key, offset)).fetchone()
+            if row is not None:
+                yield key, offset, loads(zlib.decompress(row[0]))
+
+    def clear(self, company=None, older_than_days=None):
+        """
+        Delete cached pages, for one company and/or older than some number of days.
+
+        Parameters:
+            company (str): Company id or name to clear, None for every company.
+            older_than_days (float): Only clear pages fetched more than this many days ago, None for any age.
+
+        Returns:
+            int: Number of pages deleted.
+
+        """
+        where = []
+        params = []
+        with self.lock:
+            if company:
+                company_ids = sorted(self.find_company_ids(company))
+                # sharded searches are cached as "{company_id}|facet=value"
+                where.append("(" + " OR ".join(["company_id = ? OR company_id LIKE ?"] * len(company_ids)) + ")")
+                for company_id in company_ids:
+                    params.extend([company_id, company_id + "|%"])
+            if older_than_days is not None:
+                where.append("created < ?")
+                params.append(time.time() - older_than_days * 86400)
+            if older_than_days is None:
+                # json files left over from older versions of the cache, the cache folder also holds the
+                # employee index, manifests and sessions, so only the numbered page folders go
+                folders = company_ids if company else os.listdir(self.root)
+                for company_id in folders:
+                    if company_id.isdigit():
+                        shutil.rmtree(os.path.join(self.root, company_id), ignore_errors=True)
+            count = self.delete_rows(" AND ".join(where) or "1", params)
+            # give the space back to the file system
+            self.db.execute("VACUUM")
+        return count
+
+    def close(self):
+        with self.lock:
+            with self.db:
+                self.write_accessed()
+            self.db.close()
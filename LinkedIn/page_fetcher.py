@@ -0,0 +1,183 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import random
+import threading
+import time
+
+# marks the end of the offsets
+_done = object()
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter, shared by every thread making requests to LinkedIn.
+
+    Tokens are added at `rate` per second up to `burst`, each request takes one and waits if there are none left.
+
+    Parameters:
+        rate (float): Requests per second allowed on average.
+        burst (float): Max number of requests that can be made back to back, defaults to one second worth.
+
+    """
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst) if burst else max(1.0, self.rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def set_rate(self, rate):
+        with self.lock:
+            self.refill()
+            self.rate = float(rate)
+
+    def acquire(self):
+        """
+        Take a token, blocking until one is available.
+
+        """
+        while True:
+            with self.lock:
+                self.refill()
+                wait = self.paused_for()
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            # sleep outside the lock so other threads can still check the bucket
+            time.sleep(wait)
+
+    def paused_for(self):
+        return 0
+
+
+class AdaptiveRateLimiter(TokenBucket):
+    """
+    Token bucket that finds the request rate LinkedIn allows by itself (additive increase, multiplicative decrease).
+
+    Every healthy response raises the rate a little, every throttled response cuts it in half and pauses
+    all requests for the backoff delay, so a long scrape runs close to the allowed rate instead of dying or crawling.
+
+    Parameters:
+        rate (float): Requests per second to start at.
+        min_rate (float): The rate is never cut below this.
+        max_rate (float): The rate is never raised above this, defaults to 4x the starting rate.
+        increase (float): Requests per second added for each healthy response.
+        decrease (float): Factor the rate is multiplied by on a throttled response.
+        cooldown (float): Seconds after a cut in which more throttled responses don't cut the rate again,
+            they are most likely requests that were already in flight.
+
+    """
+    def __init__(self, rate, min_rate=0.2, max_rate=None, increase=0.05, decrease=0.5, cooldown=2.0):
+        super().__init__(rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate or self.rate * 4
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.last_cut = 0.0
+        self.paused_until = 0.0
+
+    def paused_for(self):
+        return self.paused_until - time.monotonic()
+
+    def succeeded(self):
+        with self.lock:
+            self.refill()
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def throttled(self, delay=0):
+        """
+        Report a throttled response, cuts the rate and pauses every thread for delay seconds.
+
+        Parameters:
+            delay (float): Seconds to pause all requests for, see retry_delay.
+
+        """
+        with self.lock:
+            self.refill()
+            now = time.monotonic()
+            if now - self.last_cut >= self.cooldown:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self.last_cut = now
+            self.paused_until = max(self.paused_until, now + delay)
+            self.tokens = min(self.tokens, 0)
+            print(f"[AdaptiveRateLimiter]: Throttled, request rate is now {self.rate:.2f}/sec, pausing {delay:.1f}s")
+
+
+def retry_delay(attempt, retry_after=None, base=1.0, cap=120.0):
+    """
+    Get how long to wait before retrying a throttled request.
+
+    The Retry-After header is used if LinkedIn sent one, otherwise the delay doubles with every attempt.
+    Either way some random jitter is added so threads that were throttled together don't retry together.
+
+    Parameters:
+        attempt (int): Number of retries already made for this request, starting at 0.
+        retry_after (str): Value of the Retry-After header, seconds or an http date.
+        base (float): Delay of the first retry in seconds.
+        cap (float): Max delay in seconds.
+
+    Returns:
+        float: Seconds to wait.
+
+    """
+    delay = None
+    if retry_after:
+        try:
+            delay = float(retry_after)
+        except ValueError:
+            try:
+                delay = (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds()
+            except (TypeError, ValueError):
+                delay = None
+    if delay is None or delay < 0:
+        delay = base * 2 ** attempt
+    return min(cap, delay) * random.uniform(1, 1.5)
+
+
+def fetch_pages(fetch_page, offsets, concurrency=4):
+    """
+    Fetch pages with several requests in flight, and hand them back in offset order.
+
+    Only a small window of offsets is submitted ahead of the page being handed back, so a caller that stops
+    early (ie on an empty page) doesn't leave hundreds of requests queued.
+
+    Parameters:
+        fetch_page (function): Called with an offset in a worker thread, returns the page for it.
+        offsets (iterable): Offsets to fetch.
+        concurrency (int): Max number of pages fetched at the same time.
+
+    Returns:
+        generator: (offset, page) tuples, in the order of offsets. An exception raised by fetch_page
+        is raised again when its page is reached.
+
+    """
+    offsets = iter(offsets)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        try:
+            for offset in offsets:
+                pending.append((offset, executor.submit(fetch_page, offset)))
+                if len(pending) >= concurrency * 2:
+                    break
+
+            while pending:
+                offset, future = pending.popleft()
+                page = future.result()
+                next_offset = next(offsets, _done)
+                if next_offset is not _done:
+                    pending.append((next_offset, executor.submit(fetch_page, next_offset)))
+                yield offset, page
+        finally:
+            # the caller stopped early or a page failed, don't fetch the rest
+            for _, future in pending:
+                future.cancel()
@@ -0,0 +1,170 @@
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+
+from job_categorizer import normalize_headline
+from job_ranker import load_job_ranker
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # parquet export is only available with pyarrow installed
+    pa = None
+
+# columns that repeat a lot, stored once per row group and referenced by index
+DICTIONARY_COLUMNS = ["role_1", "role_2", "location"]
+
+
+def employee_schema():
+    """
+    Get the arrow schema of an exported employee, without the company column, which is the partition.
+
+    """
+    return pa.schema([
+        pa.field("name", pa.string()),
+        pa.field("headline", pa.string()),
+        pa.field("role_1", pa.dictionary(pa.int32(), pa.string())),
+        pa.field("role_2", pa.dictionary(pa.int32(), pa.string())),
+        pa.field("role_scores", pa.list_(pa.float32())),
+        pa.field("location", pa.dictionary(pa.int32(), pa.string())),
+        pa.field("entityUrn", pa.string()),
+        pa.field("scraped_at", pa.timestamp("s", tz="UTC")),
+    ])
+
+
+def partition_dir(root, company_name):
+    # hive style, so readers get the company column back from the folder name
+    return os.path.join(root, f"company={company_name.replace('/', '_')}")
+
+
+class EmployeeParquetWriter:
+    """
+    Writes categorized employees to the company's partition of a parquet dataset, as pages arrive.
+
+    Rows are buffered and staged in a hidden folder of the partition as one segment per checkpoint of the csv,
+    named by the offset it ends at. Only publish moves them into the dataset, merged into one file that
+    replaces the company's earlier files, so the partition always holds the company's last finished scrape.
+    A failed scrape never shows up in the dataset, and a resumed scrape drops the segments past the checkpoint
+    it resumes from, as those pages are fetched again.
+
+    Parameters:
+        root (str): Folder of the dataset, one company=<name> folder per company.
+        company_name (str): Name of the company, the partition the file goes in.
+        scraped_at (float): Time the scrape started, a resumed scrape must pass the same time.
+        csv_path (str): Path to the jobs csv, the roles are scored against it.
+        row_group_size (int): Number of rows per row group of the published file.
+        resume_offset (int): Offset the scrape resumes from, None for a new scrape.
+
+    """
+    def __init__(self, root, company_name, scraped_at=None, csv_path="jobs.csv", row_group_size=10000,
+                 resume_offset=None):
+        if pa is None:
+            raise ImportError("Parquet export needs pyarrow, install it with pip install pyarrow")
+        self.company_name = company_name
+        self.scraped_at = datetime.fromtimestamp(scraped_at or time.time(), timezone.utc)
+        self.job_ranker = load_job_ranker(csv_path)
+        self.row_group_size = row_group_size
+        self.schema = employee_schema()
+        self.columns = {field.name: [] for field in self.schema}
+        self.buffered = 0
+        self.rows = 0
+        self.segments = 0
+        self.published = False
+
+        self.directory = partition_dir(root, company_name)
+        # datasets skip files and folders starting with a dot
+        self.staging = os.path.join(self.directory, f".staging-{int(self.scraped_at.timestamp())}")
+        self.path = os.path.join(self.directory, f"part-{int(self.scraped_at.timestamp())}.parquet")
+        if resume_offset is None:
+            # segments of scrapes that were never resumed
+            for name in os.listdir(self.directory) if os.path.isdir(self.directory) else []:
+                if name.startswith(".staging-"):
+                    shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+        else:
+            for name in os.listdir(self.staging) if os.path.isdir(self.staging) else []:
+                if not name.endswith(".parquet") or int(name.split("-")[1]) > resume_offset:
+                    os.remove(os.path.join(self.staging, name))
+        os.makedirs(self.staging, exist_ok=True)
+
+    def write_page(self, employees, jobs_cats):
+        """
+        Add a page of categorized employees.
+
+        Parameters:
+            employees (list): Employees of one page, as returned by get_employees.
+            jobs_cats (list): (role 1, role 2) of each employee, as returned by categorize_batch.
+
+        """
+        for emp, (role_1, role_2) in zip(employees, jobs_cats):
+            headline = normalize_headline(emp.primarySubtitle, self.company_name)
+            # "Role undetected" isn't a job, so it has no score
+            roles = [role for role in (role_1, role_2) if role in self.job_ranker.ids]
+            scores = dict(self.job_ranker.score_jobs(headline, roles))
+            self.columns["name"].append(emp.title)
+            self.columns["headline"].append(emp.primarySubtitle)
+            self.columns["role_1"].append(role_1)
+            self.columns["role_2"].append(role_2 or None)
+            self.columns["role_scores"].append([scores.get(role, 0.0) for role in roles])
+            self.columns["location"].append(emp.secondarySubtitle)
+            self.columns["entityUrn"].append(emp.entityUrn)
+            self.columns["scraped_at"].append(self.scraped_at)
+        self.buffered += len(employees)
+
+    def checkpoint(self, next_offset):
+        """
+        Stage the rows buffered since the last checkpoint, called when the csv is checkpointed.
+
+        Parameters:
+            next_offset (int): Offset of the page after the last one written, as checkpointed in the manifest.
+
+        """
+        if not self.buffered:
+            return
+        table = pa.table({name: pa.array(values, type=self.schema.field(name).type)
+                          for name, values in self.columns.items()}, schema=self.schema)
+        path = os.path.join(self.staging, f"segment-{next_offset:012d}-{self.segments:06d}.parquet")
+        pq.write_table(table, path + ".tmp", compression="zstd", use_dictionary=DICTIONARY_COLUMNS)
+        os.replace(path + ".tmp", path)
+        self.segments += 1
+        self.rows += self.buffered
+        self.buffered = 0
+        for values in self.columns.values():
+            values.clear()
+
+    def publish(self):
+        """
+        Merge the staged segments into one file that replaces the company's earlier files in the dataset,
+        call once the scrape finished.
+
+        """
+        names = sorted(name for name in os.listdir(self.staging) if name.endswith(".parquet"))
+        tables = [pq.read_table(os.path.join(self.staging, name), schema=self.schema) for name in names]
+        table = pa.concat_tables(tables) if tables else self.schema.empty_table()
+        tmp_path = os.path.join(self.directory, "." + os.path.basename(self.path) + ".tmp")
+        pq.write_table(table, tmp_path, row_group_size=self.row_group_size, compression="zstd",
+                       use_dictionary=DICTIONARY_COLUMNS)
+        os.replace(tmp_path, self.path)
+        for name in os.listdir(self.directory):
+            if name.startswith("part-") and os.path.join(self.directory, name) != self.path:
+                os.remove(os.path.join(self.directory, name))
+        shutil.rmtree(self.staging, ignore_errors=True)
+        self.published = True
+
+
+def read_employees(root, columns=None, company=None):
+    """
+    Read the exported employees back as an arrow table, only reading the columns asked for.
+
+    Parameters:
+        root (str): Folder of the dataset.
+        columns (list): Columns to read, ie ["role_1", "location"], all of them if None.
+        company (str): Only read this company's partition.
+
+    Returns:
+        pyarrow.Table: The employees, with the company column from the partition folders.
+
+    """
+    dataset = ds.dataset(root, format="parquet", partitioning="hive")
+    return dataset.to_table(columns=columns, filter=(ds.field("company") == company) if company else None)
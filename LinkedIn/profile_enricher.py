@@ -0,0 +1,142 @@
+import csv
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from employee_pages import get_item_key
+from json_codec import dumps, loads
+from page_cache import CACHE_ROOT
+
+PROFILE_CSV_HEADER = ["Name", "Headline", "Location", "Industry", "Current Title", "Current Company", "Current Start",
+                      "Experience", "Education", "Profile Urn"]
+
+
+def profile_uri(urn):
+    # "urn:li:fsd_profile:ACoAAB" -> "/identity/profiles/ACoAAB/profileView"
+    return f"/identity/profiles/{urn.rsplit(':', 1)[-1]}/profileView"
+
+
+def format_date(date):
+    if not date:
+        return ""
+    return f"{date.get('year', '')}-{date['month']:02d}" if date.get("month") else str(date.get("year", ""))
+
+
+def project_profile(data):
+    """
+    Project a LinkedIn profileView response down to the fields the enrichment uses.
+
+    Parameters:
+        data (dict): The profileView response.
+
+    Returns:
+        dict: {"name", "headline", "location", "industry", "experience": [[title, company, start, end]],
+        "education": [[school, degree, field, start, end]]}, dates are "YYYY-MM" or "YYYY", most recent first.
+
+    """
+    profile = data.get("profile", {})
+    return {
+        "name": f"{profile.get('firstName', '')} {profile.get('lastName', '')}".strip(),
+        "headline": profile.get("headline", ""),
+        "location": profile.get("locationName", ""),
+        "industry": profile.get("industryName", ""),
+        "experience": [[
+            item.get("title", ""),
+            item.get("companyName", ""),
+            format_date(get_item_key(item, ["timePeriod", "startDate"])),
+            format_date(get_item_key(item, ["timePeriod", "endDate"])),
+        ] for item in get_item_key(data, ["positionView", "elements"]) or []],
+        "education": [[
+            item.get("schoolName", ""),
+            item.get("degreeName", ""),
+            item.get("fieldOfStudy", ""),
+            format_date(get_item_key(item, ["timePeriod", "startDate"])),
+            format_date(get_item_key(item, ["timePeriod", "endDate"])),
+        ] for item in get_item_key(data, ["educationView", "elements"]) or []],
+    }
+
+
+def profile_row(urn, profile):
+    """
+    Turn a projected profile into a row of the profiles csv, see PROFILE_CSV_HEADER.
+
+    The current position is the most recent one with no end date, the experience and education columns list
+    every entry as "title @ company (start - end)" and "degree, field @ school (start - end)", joined by " | ".
+
+    """
+    current = next((item for item in profile["experience"] if not item[3]), ["", "", "", ""])
+    experience = " | ".join(f"{title} @ {company} ({start} - {end or 'present'})"
+                            for title, company, start, end in profile["experience"])
+    education = " | ".join(f"{', '.join(part for part in (degree, field) if part)} @ {school} ({start} - {end})"
+                           for school, degree, field, start, end in profile["education"])
+    return [profile["name"], profile["headline"], profile["location"], profile["industry"], current[0], current[1],
+            current[2], experience, education, urn]
+
+
+class ProfileCache:
+    """
+    Cache of projected full profiles, keyed by profile urn, kept in one sqlite file in the cache folder.
+
+    Parameters:
+        root (str): Cache folder.
+        ttl_days (float): Profiles older than this are fetched again, None to keep them forever.
+
+    """
+    def __init__(self, root=CACHE_ROOT, ttl_days=None):
+        os.makedirs(root, exist_ok=True)
+        self.ttl = ttl_days * 86400 if ttl_days else None
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(root, "profiles.sqlite3"), check_same_thread=False)
+        with self.db:
+            self.db.execute("CREATE TABLE IF NOT EXISTS profiles (urn TEXT PRIMARY KEY, data BLOB, created REAL)")
+
+    def get(self, urn):
+        with self.lock:
+            row = self.db.execute("SELECT data, created FROM profiles WHERE urn = ?", (urn,)).fetchone()
+        if row is None or (self.ttl is not None and time.time() - row[1] > self.ttl):
+            return None
+        return loads(zlib.decompress(row[0]))
+
+    def put(self, urn, profile):
+        data = zlib.compress(dumps(profile))
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO profiles (urn, data, created) VALUES (?, ?, ?)",
+                            (urn, data, time.time()))
+
+    def close(self):
+        self.db.close()
+
+
+class ProfileCSVWriter:
+    """
+    Streams enriched profiles to the profiles csv as they arrive, flushing every few rows.
+
+    Parameters:
+        path (str): Path of the csv to write.
+        flush_every (int): Number of rows between flushes to disk.
+
+    """
+    def __init__(self, path, flush_every=25):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.flush_every = flush_every
+        self.rows = 0
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.csv_writer = csv.writer(self.file)
+        self.csv_writer.writerow(PROFILE_CSV_HEADER)
+
+    def write_profile(self, urn, profile):
+        self.csv_writer.writerow(profile_row(urn, profile))
+        self.rows += 1
+        if self.rows % self.flush_every == 0:
+            self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
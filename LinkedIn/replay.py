@@ -0,0 +1,130 @@
+"""
+LinkedIn Scraper - Offline Replay
+
+Rebuilds the output csv of every company in the page cache without touching LinkedIn, ie after the
+categorization changed. No login or window is needed, each company is replayed in its own worker process.
+
+    python replay.py --output replayed/ --workers 4
+
+The csv files are named after the company's LinkedIn name, '{company}_linkedin_data.csv', in the same format
+as a scrape writes them.
+
+"""
+import argparse
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from employee_pages import is_projected, page_employees, project_page
+from job_categorizer import load_headline_cache
+from output_writer import EmployeeCSVWriter
+from page_cache import CACHE_ROOT, PageCache
+from parquet_export import EmployeeParquetWriter
+
+
+def replay_company(company_id, output_dir, root=CACHE_ROOT, csv_path="jobs.csv", parquet=False):
+    """
+    Rebuild the output csv of one company from its cached pages.
+
+    Everyone is only written once (by profile urn), like in a sharded scrape where the shards overlap.
+
+    Parameters:
+        company_id (str): The LinkedIn company ID.
+        output_dir (str): Directory to write the csv to.
+        root (str): Cache folder to read the pages from.
+        csv_path (str): Path to the jobs csv.
+        parquet (bool): Also write the company to the parquet dataset in '{output_dir}/parquet', replacing what the
+            dataset had for it.
+
+    Returns:
+        tuple: (company id, path of the csv, number of employees written).
+
+    """
+    page_cache = PageCache(root)
+    try:
+        company_name = page_cache.company_name(company_id) or str(company_id)
+        path = os.path.join(output_dir, f"{company_name}_linkedin_data.csv".replace(" ", "_"))
+        cache = load_headline_cache(csv_path, db_path=os.path.join(root, "headline_cache.sqlite3"))
+        exporter = EmployeeParquetWriter(os.path.join(output_dir, "parquet"), company_name,
+                                         csv_path=csv_path) if parquet else None
+        writer = EmployeeCSVWriter(path, company_name=company_name, csv_path=csv_path, cache=cache, exporter=exporter)
+        try:
+            seen = set()
+            for key, offset, page in page_cache.iter_pages(company_id):
+                if not is_projected(page):
+                    # a full response cached by an older version
+                    page = project_page(page["data"]["searchDashClustersByAll"])
+                employees = []
+                for emp in page_employees(page):
+                    urn = emp.urn
+                    # results without a urn can't be told apart, so they are all kept
+                    if urn:
+                        if urn in seen:
+                            continue
+                        seen.add(urn)
+                    employees.append(emp)
+                writer.write_page(employees)
+            writer.close()
+            if exporter is not None:
+                exporter.publish()
+        finally:
+            writer.close()
+    finally:
+        page_cache.close()
+    return company_id, writer.path, writer.rows
+
+
+def replay_all(output_dir, company_ids=None, workers=None, root=CACHE_ROOT, csv_path="jobs.csv", parquet=False):
+    """
+    Rebuild the output csv of every cached company, several companies at a time in a process pool.
+
+    Parameters:
+        output_dir (str): Directory to write the csv files to.
+        company_ids (list): Companies to replay, every cached company if None.
+        workers (int): Number of worker processes, defaults to the number of cores.
+        root (str): Cache folder to read the pages from.
+        csv_path (str): Path to the jobs csv.
+        parquet (bool): Also write every company to the parquet dataset in '{output_dir}/parquet'.
+
+    Returns:
+        list: (company id, path of the csv, number of employees written) of every company, in the order they finished.
+
+    """
+    if company_ids is None:
+        page_cache = PageCache(root)
+        company_ids = page_cache.cached_company_ids()
+        page_cache.close()
+    os.makedirs(output_dir, exist_ok=True)
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(replay_company, company_id, output_dir, root, csv_path, parquet): company_id
+                   for company_id in company_ids}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as error:
+                print(f"{futures[future]}: {type(error).__name__}: {error}")
+                continue
+            print(f"{result[0]}: {result[2]} employees in {result[1]}")
+            results.append(result)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild the output csv files from the page cache, offline.")
+    parser.add_argument("-o", "--output", default=".", help="directory to write the csv files to")
+    parser.add_argument("--companies", nargs="*", help="company ids to replay, all cached companies if left out")
+    parser.add_argument("--workers", type=int, help="number of worker processes, defaults to the number of cores")
+    parser.add_argument("--cache", default=CACHE_ROOT, help="cache folder to read the pages from")
+    parser.add_argument("--jobs", default="jobs.csv", help="path to the jobs csv")
+    parser.add_argument("--parquet", action="store_true",
+                        help="also write a parquet dataset partitioned by company to <output>/parquet, needs pyarrow")
+    args = parser.parse_args(argv)
+    replay_all(args.output, args.companies, args.workers, args.cache, args.jobs, args.parquet)
+
+
+if __name__ == "__main__":
+    # needed for the process pool in a pyinstaller executable
+    multiprocessing.freeze_support()
+    main()
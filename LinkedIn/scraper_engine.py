@@ -0,0 +1,708 @@
+"""
+LinkedIn Scraper - Engine
+
+The scraping half of the LinkedIn scraper, with no tkinter in it. linkedin_scraper.py puts the GUI on top of it,
+and linkedin_cli.py runs it from the command line.
+
+fetch_employees and get_employees referenced from Tom Quirk's github
+
+"""
+import os
+import sys
+import tempfile
+import time
+
+import requests
+from linkedin_api import Linkedin
+
+from job_categorizer import load_headline_cache
+from employee_pages import is_projected, page_employees, project_page
+from json_codec import loads
+from metrics import RunMetrics
+from employee_index import DeltaScan, EmployeeIndex
+from page_cache import PageCache
+from page_fetcher import AdaptiveRateLimiter, fetch_pages, retry_delay
+from session_pool import Session, SessionPool
+from session_store import SessionStore
+from company_resolver import CompanyResolver
+from profile_enricher import ProfileCache, ProfileCSVWriter, profile_uri, project_profile
+from parquet_export import EmployeeParquetWriter
+from output_writer import EmployeeCSVWriter
+from checkpoint import RunManifest
+from shard_planner import RESULT_CAP, build_search_uri, plan_shards, shard_key, shard_offsets
+
+
+class LinkedInAPIError(Exception):
+    pass
+
+
+class ScrapeCancelled(Exception):
+    pass
+
+
+def session_is_valid(api):
+    """
+    Check that a LinkedIn session is still logged in with one cheap request for the logged in member.
+
+    """
+    try:
+        return api._fetch("/me").ok
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+        return False
+
+
+def pick_company(companies, company_name=""):
+    """
+    Pick a company from search results without asking, the one named exactly like the search, or else the first.
+
+    Parameters:
+        companies (list): Company objects from api.search_companies.
+        company_name (str): The name that was searched for.
+
+    Returns:
+        dict: The company object, or None if there were no results.
+
+    """
+    for companyObj in companies:
+        if companyObj['name'].strip().lower() == company_name.strip().lower():
+            return companyObj
+    return companies[0] if companies else None
+
+
+class ScraperEngine:
+    """
+    Scrapes the employees of companies into csv files.
+
+    One engine can scrape several companies back to back, the page cache, employee index and headline cache
+    stay open between them. What the engine has to say goes through callbacks, so it can run under the GUI
+    or headless.
+
+    Parameters:
+        username (str): LinkedIn email.
+        password (str): LinkedIn password.
+        accounts (list): (username, password) of every account to spread requests over, see session_pool.SessionPool.
+            Defaults to just username and password.
+        start_val (int): Employee to start scraping from.
+        end_val (int): Employee to stop scraping at.
+        concurrency (int): Pages fetched at the same time, per account.
+        request_rate (float): Starting requests per second to LinkedIn per account, shared by all fetch threads and
+            adjusted as we go.
+        delta_mode (bool): Only write joiners, leavers and changed headlines since the last scrape of a company.
+        csv_path (str): Path to the jobs csv.
+        export_parquet (bool): Also write every finished scrape to a parquet dataset in '{location}/parquet', needs
+            pyarrow. Delta scrapes aren't exported, they only hold the changes.
+        on_status (function): Called with a status message.
+        on_progress (function): Called with the progress of the current scrape, from 0 to 1.
+        choose_company (function): Called with the company search results and the searched name when the match
+            is ambiguous, returns the company to scrape or None to cancel. Defaults to pick_company, whose
+            guesses aren't remembered by the company resolver.
+        cancel_event (threading.Event): Set to stop the scrape after the page it is on, it raises ScrapeCancelled.
+
+    """
+    max_retries = 6  # retries of a throttled page before giving up
+    # status codes LinkedIn uses when it wants us to slow down
+    throttle_statuses = (429, 999)
+    cache_ttl_days = 30  # cached pages older than this are fetched again
+    cache_max_bytes = 500 * 1024 * 1024  # least recently used pages are evicted past this size
+    cache_raw_pages = False  # also keep the full LinkedIn response of each page in the cache, ~50x bigger
+    shard_large_companies = True  # split searches of companies past LinkedIn's 1000 result cap into smaller searches
+    profile_ttl_days = 30  # cached full profiles older than this are fetched again
+    delta_stop_pages = 3  # in delta mode, stop once this many pages in a row had nothing new
+
+    def __init__(self, username="", password="", accounts=None, start_val=0, end_val=sys.maxsize, concurrency=4, request_rate=5,
+                 delta_mode=False, csv_path="jobs.csv", export_parquet=False, on_status=print, on_progress=None, choose_company=None,
+                 cancel_event=None):
+        self.username = username
+        self.password = password
+        self.accounts = accounts or [(username, password)]
+        self.start_val = start_val
+        self.end_val = end_val
+        self.concurrency = concurrency
+        self.request_rate = request_rate
+        self.delta_mode = delta_mode
+        self.csv_path = csv_path
+        self.export_parquet = export_parquet
+        self.on_status = on_status
+        self.on_progress = on_progress
+        self.choose_company = choose_company or pick_company
+        self.remember_choices = choose_company is not None
+        # companies resolved by resolve_companies, used by the scrapes that follow
+        self.resolved = {}
+        self.cancel_event = cancel_event
+
+        self.sessions = None
+        self.session_store = SessionStore()
+        self.resolver = CompanyResolver()
+        self.profile_cache = ProfileCache(ttl_days=self.profile_ttl_days)
+        self.page_cache = PageCache(ttl_days=self.cache_ttl_days, max_bytes=self.cache_max_bytes)
+        self.employee_index = EmployeeIndex()
+        self.headline_cache = None
+        # timers and counters of everything the engine does, see metrics.RunMetrics
+        self.metrics = RunMetrics()
+
+        # state of the scrape in progress
+        self.company_name = ""
+        self.total = 0
+        self.run_start = start_val
+        self.run_end = end_val
+        self.run_delta = delta_mode
+
+    def auth(self):
+        """
+        Authenticate every account with the LinkedIn API.
+
+        An account with a saved session that is still logged in reuses it, the others log in and their session
+        is saved, see session_store.SessionStore. An account that fails to authenticate is left out of the
+        session pool, the error is only raised if every account failed.
+
+        """
+        self.on_status("Authenticating and securing API access...")
+        started = time.perf_counter()
+        sessions = []
+        errors = []
+        for username, password in self.accounts:
+            print("Auth", username)
+            try:
+                api = self.login(username, password)
+            except Exception as error:
+                print(f"Auth failed for {username}: {error}")
+                errors.append(error)
+                continue
+            sessions.append(Session(api, username, AdaptiveRateLimiter(self.request_rate)))
+        if not sessions:
+            raise errors[0]
+        self.sessions = SessionPool(sessions)
+        self.metrics.add_time("auth", time.perf_counter() - started)
+
+    def login(self, username, password):
+        """
+        Get a logged in LinkedIn API client for an account, from its saved session if it is still valid.
+
+        Parameters:
+            username (str): LinkedIn email.
+            password (str): LinkedIn password.
+
+        Returns:
+            Linkedin: The API client.
+
+        """
+        cookies = self.session_store.load(username)
+        if cookies is not None:
+            api = Linkedin(username, password, cookies=cookies)
+            if session_is_valid(api):
+                print(f"Reusing saved session for {username}")
+                return api
+            self.session_store.delete(username)
+
+        # refresh_cookies, so linkedin_api doesn't use its own unencrypted cookie cache, and the plain copy it
+        # saves on login goes to a folder that is removed straight after, the store keeps the session encrypted
+        with tempfile.TemporaryDirectory() as cookies_dir:
+            # linkedin_api joins the folder and the file name without a separator
+            api = Linkedin(username, password, refresh_cookies=True, cookies_dir=cookies_dir + os.sep)
+        if not session_is_valid(api):
+            raise LinkedInAPIError(f"Logged in as {username} but LinkedIn doesn't accept the session")
+        if self.session_store.enabled:
+            self.session_store.save(username, api.client.cookies)
+        return api
+
+    @property
+    def fetch_concurrency(self):
+        return self.concurrency * (len(self.sessions) if self.sessions is not None else 1)
+
+    def fetch(self, uri, what=""):
+        """
+        Make a request to LinkedIn through the session pool, backing off and retrying when throttled or the connection fails.
+
+        Parameters:
+            uri (str): The uri to fetch.
+            what (str): What is being fetched, for the log, ie "offset 10".
+
+        Returns:
+            requests.Response: The successful response.
+
+        """
+        attempt = 0
+        while True:
+            # wait for our turn on the least busy account, every fetch thread shares the same limits
+            session = self.sessions.acquire()
+            self.metrics.count("requests")
+            try:
+                r = session.api._fetch(uri)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as error:
+                # a network error says nothing about the account, so it is handed back without a throttle strike
+                self.sessions.failed(session)
+                if attempt >= self.max_retries:
+                    raise LinkedInAPIError(f"Error with LinkedIn api, {type(error).__name__} after {attempt} retries")
+                delay = retry_delay(attempt)
+                print(f"[fetch()]: {type(error).__name__} at {what}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            except Exception:
+                # hand the session back whatever went wrong, or it counts as busy for the rest of the run
+                self.sessions.failed(session)
+                raise
+
+            if r.ok:
+                self.sessions.succeeded(session)
+                break
+
+            # this runs in a fetch thread, so errors are raised for the caller to show
+            if r.status_code not in self.throttle_statuses or attempt >= self.max_retries:
+                self.sessions.failed(session)
+                print(f"Error with LinkedIn api {r.status_code} ({r.reason})")
+                raise LinkedInAPIError(f"Error with LinkedIn api {r.status_code} ({r.reason})")
+
+            # back off and retry the same uri, the account's limiter pauses every other thread using it,
+            # and the retry goes to whichever account is healthiest
+            delay = retry_delay(attempt, r.headers.get("Retry-After"))
+            print(f"[fetch()]: Throttled at {what} on {session.name}, retrying in {delay:.1f}s")
+            self.sessions.throttled(session, delay)
+            self.metrics.count("throttled")
+            attempt += 1
+
+        print(f"[fetch()]: OK! LinkedIn returned status code {r.status_code} ({r.reason})")
+        return r
+
+    # this method fetches the employee data from linkedin via requests in the form of a json file
+    # it uses 2 requests for every 10 users scraped
+    def fetch_employees(self, company_id, offset=0, shard=()):
+        """
+        Fetch employee data from LinkedIn using the unofficial API.
+
+        This function fetches employee data from LinkedIn using GraphQL requests and stores the data in the page cache.
+        Only the fields the scraper uses are cached (see employee_pages.project_page), not the whole response.
+        It uses two requests for every 10 users scraped.
+
+        Parameters:
+            company_id (str): The LinkedIn company ID.
+            offset (int): The offset for paginating through employee data.
+            shard (tuple): (facet, value) filters narrowing the search, see shard_planner.
+
+        Returns:
+            dict: The projected page of employee data.
+
+        """
+        cache_key = shard_key(company_id, shard)
+        started = time.perf_counter()
+        # a delta scrape is looking for what changed since the last scrape, so it can't use cached pages
+        r = self.page_cache.get(cache_key, offset) if not self.run_delta else None
+        if r is not None:
+            print(f"[get_employees()]: OK! Using cached page {offset} of {cache_key}.")
+            if not is_projected(r):
+                # the full response, cached by an older version, is projected once and cached again
+                page = project_page(r["data"]["searchDashClustersByAll"])
+                self.page_cache.put(cache_key, offset, page, raw=r if self.cache_raw_pages else None)
+                r = page
+            self.metrics.count("cache_hits")
+            self.metrics.add_time("fetch_employees.cache", time.perf_counter() - started)
+
+        else:
+            uri = build_search_uri(company_id, offset, shard)
+            response = self.fetch(uri, f"offset {offset}")
+            with self.metrics.timer("decode"):
+                r = loads(response.content)
+
+            if not r["data"]["searchDashClustersByAll"]:
+                print(f"Bad json. LinkedIn returned error:", r["errors"][0]["message"])
+                raise LinkedInAPIError(f"Error with LinkedIn API " + r["errors"][0]["message"])
+
+            # Cache request
+            with self.metrics.timer("project"):
+                page = project_page(r["data"]["searchDashClustersByAll"])
+            with self.metrics.timer("cache_write"):
+                self.page_cache.put(cache_key, offset, page, raw=r if self.cache_raw_pages else None)
+            r = page
+            self.metrics.count("cache_misses")
+            self.metrics.add_time("fetch_employees.network", time.perf_counter() - started)
+
+        return r
+
+    # get the necessary employee data from the above json file and method
+    def get_employees(self, company_id, offset=0):
+        """
+        Retrieve necessary employee data from LinkedIn.
+
+        This function retrieves necessary employee data from the projected page obtained through the LinkedIn API.
+
+        Parameters:
+            company_id (str): The LinkedIn company ID.
+            offset (int): The offset for paginating through employee data.
+
+        Returns:
+            list: List of Employee records.
+
+        """
+        with self.metrics.timer("get_employees"):
+            page = self.fetch_employees(company_id, offset=offset)
+
+            self.total = page["total"]
+            if self.run_end == 0:  # this is for if the user didnt specify an end val
+                print("total emp: ", self.total)
+                self.run_end = self.total
+
+            return page_employees(page)
+
+    # retrieves the company's urn id from a company name
+    def check_cancelled(self):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise ScrapeCancelled("Scrape cancelled")
+
+    def search_companies(self, companyName):
+        session = self.sessions.acquire()
+        try:
+            companies = session.api.search_companies(keywords=companyName, limit=5)
+        except Exception:
+            self.sessions.failed(session)
+            raise
+        self.sessions.succeeded(session)
+        return companies
+
+    def resolve_companies(self, companyNames):
+        """
+        Resolve a list of company names up front, several searches at a time, so a batch only stops for
+        the ambiguous names before it starts. See company_resolver.CompanyResolver.resolve_many.
+
+        Parameters:
+            companyNames (list): The names of the companies.
+
+        Returns:
+            dict: Company object of every name, None for names with no company picked. Names whose search
+            failed are left out, their scrape searches again.
+
+        """
+        resolved = self.resolver.resolve_many(companyNames, self.search_companies, self.choose_company,
+                                              concurrency=self.fetch_concurrency,
+                                              remember_choice=self.remember_choices)
+        self.resolved.update(resolved)
+        return resolved
+
+    def get_company_id_from_name(self, companyName):
+        """
+        Get the LinkedIn company ID from a company name.
+
+        Names resolved by resolve_companies or before are answered by the company resolver. Otherwise this function searches for companies
+        on LinkedIn based on a provided name, accepts a confident match, and picks the right one with
+        choose_company if it's ambiguous.
+
+        Parameters:
+            companyName (str): The name of the company to search for.
+
+        Returns:
+            str: The LinkedIn company ID.
+
+        """
+        if companyName in self.resolved:
+            companyObj = self.resolved[companyName]
+        else:
+            companyObj = self.resolver.resolve(companyName, self.search_companies, self.choose_company,
+                                               remember_choice=self.remember_choices)
+        if companyObj is None:
+            raise ScrapeCancelled(f"No company picked for {companyName}")
+        self.company_name = companyObj['name']
+        self.page_cache.set_company_name(companyObj['urn_id'], self.company_name)  # so its cache can be cleared by name
+        print(self.company_name)
+        print(companyObj)
+        return companyObj['urn_id']
+
+    def scrape(self, company, location="", resume=False):
+        """
+        Retrieve the employees of a company from LinkedIn and store them in a CSV file.
+
+        Each page is categorized and written as soon as it arrives. When resuming, the last unfinished scrape of
+        the company continues from its checkpoint in the run manifest. Every employee seen is recorded in the
+        employee index, in delta mode only the changes since the last scrape are written, and paging stops once
+        a few pages in a row had nothing new. Whatever was written before an error stays in the file.
+
+        Parameters:
+            company (str): The name of the company to scrape.
+            location (str): The directory to write the CSV file to.
+            resume (bool): Continue the last unfinished scrape of the company.
+
+        Returns:
+            EmployeeCSVWriter: The closed writer, with the path of the CSV file and the number of rows written.
+
+        """
+        print("Retrieving data")
+        self.on_status("Obtaining data, may take a while")
+        self.run_start = self.start_val
+        self.run_end = self.end_val
+        self.run_delta = self.delta_mode
+        self.total = 0
+        i = (self.run_start // 10) * 10  # use floor division to make the start val a multiple of 10
+        print(i)
+        print(self.run_end)
+        if self.headline_cache is None:
+            # repeated headlines are answered from the headline cache, which persists between runs
+            self.headline_cache = load_headline_cache(self.csv_path)
+
+        id = self.get_company_id_from_name(companyName=company)
+        print(id)
+        manifest = RunManifest.load(id)
+        resuming = resume and manifest is not None and manifest.can_resume()
+        if resuming:
+            # pick up the settings and file of the interrupted scrape, and carry on from its next offset
+            self.run_start = manifest.settings.get("start_val", self.run_start)
+            self.run_end = manifest.settings.get("end_val", self.run_end)
+            self.run_delta = manifest.settings.get("delta", False)
+            i = manifest.next_offset
+            print(f"Resuming {manifest.company_name} at {i}, {manifest.rows} employees already in {manifest.output_path}")
+        else:
+            if resume:
+                print("Nothing to resume, starting a new scrape")
+            manifest = RunManifest(id, self.company_name, self.output_path(company, location),
+                                   {"start_val": self.run_start, "end_val": self.run_end,
+                                    "concurrency": self.concurrency, "request_rate": self.request_rate,
+                                    "delta": self.run_delta, "started": time.time()})
+            manifest.next_offset = i
+        # the start time of the whole scrape, so people seen before a resume aren't taken for leavers
+        scan = DeltaScan(self.employee_index, id, only_changes=self.run_delta, stop_after=self.delta_stop_pages,
+                         started=manifest.settings.get("started"))
+        if resuming:
+            scan.restore(manifest.state.get("delta"))
+        complete = False
+
+        exporter = None
+        if self.export_parquet and not self.run_delta:
+            exporter = EmployeeParquetWriter(os.path.join(os.path.dirname(manifest.output_path), "parquet"),
+                                             self.company_name, manifest.settings.get("started"), self.csv_path,
+                                             resume_offset=manifest.next_offset if resuming else None)
+        writer = EmployeeCSVWriter(manifest.output_path, company_name=self.company_name, csv_path=self.csv_path,
+                                   cache=self.headline_cache, manifest=manifest, resume=resuming, delta=scan,
+                                   exporter=exporter, metrics=self.metrics)
+        try:
+            if resuming and manifest.settings.get("sharded"):
+                self.scrape_shards(id, writer, manifest)
+            elif (i + 10) <= self.run_end:
+                self.check_cancelled()
+                # the first page tells us the total, after that the remaining pages are fetched several at a time
+                # offset is always multiples of 10, as one call scrapes 10 employees
+                employees = self.get_employees(id, offset=i)
+                manifest.total = self.total
+                scan.headcount = self.total
+                if (not resuming and self.shard_large_companies and i == 0 and self.total >= RESULT_CAP
+                        and self.run_end > RESULT_CAP):
+                    # LinkedIn stops at 1000 results, so the search is split into smaller ones that cover the company
+                    manifest.settings["sharded"] = True
+                    employees = []
+                    self.scrape_shards(id, writer, manifest)
+                else:
+                    writer.write_page(employees, next_offset=i + 10)
+                    self.update_progress(i + 10)
+                offsets = range(i + 10, min(self.run_end - 9, self.total), 10) if employees and not scan.done else []
+                # leavers can only be told apart when every employee was paged through, sharded searches can miss people
+                complete = (bool(employees) and self.run_start == 0 and self.run_end >= self.total
+                            and self.total < RESULT_CAP)
+                for offset, employees in fetch_pages(lambda offset: self.get_employees(id, offset=offset), offsets,
+                                                     self.fetch_concurrency):
+                    if len(employees) == 0:
+                        complete = False
+                        break
+                    writer.write_page(employees, next_offset=offset + 10)
+                    self.update_progress(offset + 10)
+                    self.check_cancelled()
+                    print(offset + 10)
+                    print(self.run_end)
+                    if scan.done:
+                        print(f"No changes in the last {self.delta_stop_pages} pages, stopping")
+                        break
+                complete = complete and not scan.done
+            self.finish_up(writer, complete)
+        finally:
+            writer.close()
+        return writer
+
+    def scrape_shards(self, company_id, writer, manifest):
+        """
+        Scrape a company past LinkedIn's 1000 result cap by splitting its search into shards.
+
+        The shards are planned with shard_planner.plan_shards, every page of every shard is fetched several at a time,
+        and people found by more than one shard are only written once (by profile urn). The plan is kept in the
+        manifest, which checkpoints the index of the next page in it and the urns written so far, so a resume
+        carries on with the same plan without fetching the pages before it again. In delta mode the rest of a
+        shard is skipped once a few pages of it in a row had nothing new. Scraping stops once end_val people
+        were taken from the pages, whether or not delta mode wrote them.
+
+        Parameters:
+            company_id (str): The LinkedIn company ID.
+            writer (EmployeeCSVWriter): The writer to stream employees to.
+            manifest (RunManifest): The manifest of this scrape.
+
+        """
+        def parallel_map(func, items):
+            return [result for _, result in fetch_pages(func, items, self.fetch_concurrency)]
+
+        if "plan" in manifest.state:
+            planned = [(tuple(tuple(pair) for pair in shard), total) for shard, total in manifest.state["plan"]]
+            seen = manifest.load_seen()
+        else:
+            self.on_status("Large company, splitting the search up")
+            planned = plan_shards(lambda shard: self.fetch_employees(company_id, 0, shard)["total"],
+                                  parallel_map=parallel_map)
+            manifest.state["plan"] = planned
+            seen = set()
+        work = shard_offsets(planned)
+        print(f"Planned {len(planned)} shards, {len(work)} pages")
+        self.on_status("Obtaining data, may take a while")
+
+        start = manifest.next_offset
+        # people taken from the pages so far, what --end is counted in, delta mode writes fewer rows than this
+        consumed = manifest.state.get("consumed", 0) if start else 0
+
+        skipped = set()
+        items = (item for item in list(enumerate(work))[start:] if item[1][0] not in skipped)
+        for (index, (shard, _)), page in fetch_pages(lambda item: self.fetch_employees(company_id, item[1][1], item[1][0]),
+                                                     items, self.fetch_concurrency):
+            if shard in skipped:
+                continue
+            employees = []
+            for emp in page_employees(page):
+                urn = emp.urn
+                # results without a urn can't be told apart, so they are all kept
+                if urn:
+                    if urn in seen:
+                        continue
+                    seen.add(urn)
+                employees.append(emp)
+            manifest.add_seen(emp.urn for emp in employees if emp.urn)
+            consumed += len(employees)
+            manifest.state["consumed"] = consumed
+            writer.write_page(employees, next_offset=index + 1)
+            self.update_progress(index + 1, out_of=len(work))
+            self.check_cancelled()
+            if writer.delta is not None and writer.delta.done:
+                # nothing new in this shard lately, move on to the next one
+                skipped.add(shard)
+                writer.delta.unchanged_pages = 0
+            if consumed >= self.run_end:
+                break
+
+    def get_profile(self, urn):
+        """
+        Get the full profile of an employee, from the profile cache or from LinkedIn.
+
+        Parameters:
+            urn (str): The profile urn, ie "urn:li:fsd_profile:ACoAAB".
+
+        Returns:
+            dict: The projected profile (see profile_enricher.project_profile), or None if it couldn't be fetched.
+
+        """
+        profile = self.profile_cache.get(urn)
+        if profile is not None:
+            return profile
+        try:
+            data = loads(self.fetch(profile_uri(urn), urn).content)
+        except LinkedInAPIError as error:
+            # one private or missing profile shouldn't stop the rest
+            print(f"[get_profile()]: {urn}: {error}")
+            return None
+        if "status" in data and data["status"] != 200:
+            print(f"[get_profile()]: {urn}: {data.get('message')}")
+            return None
+        profile = project_profile(data)
+        self.profile_cache.put(urn, profile)
+        return profile
+
+    def enrich(self, company, location="", limit=None, urns=None):
+        """
+        Fetch the full profiles (experience, start dates, education) of a company's employees into a second CSV file,
+        '{company}_linkedin_profiles.csv'.
+
+        The employees come from the employee index, so the company has to be scraped first. Profiles are fetched
+        several at a time through the session pool, cached by urn, and written as they arrive.
+
+        Parameters:
+            company (str): The name of the company.
+            location (str): The directory to write the CSV file to.
+            limit (int): Max number of profiles to fetch, all of them if None.
+            urns (list): Profile urns to fetch instead of the employees in the index.
+
+        Returns:
+            ProfileCSVWriter: The closed writer, with the path of the CSV file and the number of rows written.
+
+        """
+        id = self.get_company_id_from_name(company)
+        if urns is None:
+            urns = self.employee_index.current_urns(id)
+        urns = urns[:limit] if limit else urns
+        self.on_status(f"Fetching {len(urns)} profiles")
+        writer = ProfileCSVWriter(self.output_path(company, location, "profiles"))
+        try:
+            for number, (urn, profile) in enumerate(fetch_pages(self.get_profile, urns, self.fetch_concurrency), 1):
+                if profile is not None:
+                    writer.write_profile(urn, profile)
+                self.update_progress(number, out_of=len(urns))
+                self.check_cancelled()
+        finally:
+            writer.close()
+        print(f"Wrote {writer.rows} profiles to {writer.path}")
+        return writer
+
+    def output_path(self, company, location="", kind=None):
+        """
+        Get the path of the CSV file for a company, '{company}_linkedin_data.csv' in location,
+        or '{company}_linkedin_delta.csv' in delta mode, or '{company}_linkedin_{kind}.csv'.
+
+        """
+        kind = kind or ("delta" if self.run_delta else "data")
+        return os.path.join(location, f"{company}_linkedin_{kind}.csv".replace(" ", "_"))
+
+    def finish_up(self, writer, complete=False):
+        """
+        Finalize the scrape and close the CSV file.
+
+        The employees have already been categorized and written page by page, this flushes and closes the file.
+        The scrape is also recorded as a snapshot in the employee index, and in delta mode the leavers are written.
+
+        Parameters:
+            writer (EmployeeCSVWriter): The writer the employees were streamed to.
+            complete (bool): Whether every employee of the company was paged through, leavers are only found if so.
+
+        """
+        self.on_status("Storing data to file")
+        started = time.perf_counter()
+        if writer.delta is not None:
+            leavers = writer.delta.finish(self.total, complete)
+            if writer.only_changes and leavers:
+                writer.write_page(leavers, changes=["left"] * len(leavers))
+            print(f"{writer.delta.joiners} joined, {len(leavers)} left, {writer.delta.changed} changed"
+                  + ("" if complete else " (leavers need a full scrape)"))
+        writer.close()
+        if writer.manifest is not None:
+            writer.manifest.finish()
+        if writer.exporter is not None:
+            writer.exporter.publish()
+        self.metrics.add_time("finish_up", time.perf_counter() - started)
+        print(f"Wrote {writer.rows} employees to {writer.path}")
+        if writer.cache is not None:
+            print(writer.cache.report())
+        if self.sessions is not None:
+            print(self.sessions.report())
+        print(self.metrics.report())
+
+    def update_progress(self, prog, out_of=None):
+        """
+        Report the progress of the scrape to on_progress.
+
+        Parameters:
+            prog (int): Progress value
+            out_of (int): Value of a full bar, defaults to the start and end values
+
+        """
+        if self.on_progress is None:
+            return
+        if out_of:
+            self.on_progress(min(prog / out_of, 1))
+            return
+        # without an end value the bar runs to the company's total
+        end = min(self.run_end, self.total) if self.total else self.run_end
+        if prog > end:
+            prog = end
+        self.on_progress((prog - self.run_start) / max(1, end - self.run_start))
+
+    def close(self):
+        self.page_cache.close()
+        self.employee_index.close()
+        self.resolver.close()
+        self.profile_cache.close()
@@ -0,0 +1,117 @@
+import threading
+import time
+
+
+class Session:
+    """
+    One logged in LinkedIn account, with its own rate limit and health.
+
+    Parameters:
+        api (Linkedin): The authenticated linkedin_api client.
+        name (str): Name to report the session by, ie the account's email.
+        limiter (AdaptiveRateLimiter): Rate limiter of this account's requests.
+
+    """
+    def __init__(self, api, name, limiter):
+        self.api = api
+        self.name = name
+        self.limiter = limiter
+        self.in_flight = 0
+        self.requests = 0
+        self.throttles = 0
+        self.failures = 0
+        self.strikes = 0  # throttled responses in a row
+        self.quarantined_until = 0.0
+
+    def is_quarantined(self, now=None):
+        return self.quarantined_until > (now if now is not None else time.monotonic())
+
+
+class SessionPool:
+    """
+    Hands out requests across several LinkedIn accounts, so throughput isn't capped by one account's rate limit.
+
+    Each request goes to the healthy session with the fewest requests in flight, and waits for that session's
+    own rate limiter. A session throttled max_strikes times in a row is quarantined, it gets no requests for
+    quarantine_seconds while the other sessions carry on. The last healthy session is never quarantined,
+    it only backs off through its rate limiter.
+
+    Parameters:
+        sessions (list): Session objects to use.
+        max_strikes (int): Throttled responses in a row before a session is quarantined.
+        quarantine_seconds (float): Seconds a quarantined session is left alone.
+
+    """
+    def __init__(self, sessions, max_strikes=3, quarantine_seconds=600):
+        if not sessions:
+            raise ValueError("A session pool needs at least one session")
+        self.sessions = list(sessions)
+        self.max_strikes = max_strikes
+        self.quarantine_seconds = quarantine_seconds
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def acquire(self):
+        """
+        Get a session to make a request with, blocking until a session is out of quarantine and its rate limit allows it.
+
+        Every session from acquire must be handed back with succeeded, throttled or failed.
+
+        Returns:
+            Session: The session to use.
+
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                ready = [s for s in self.sessions if not s.is_quarantined(now)]
+                if ready:
+                    # paused sessions last, then the least busy
+                    session = min(ready, key=lambda s: (s.limiter.paused_for() > 0, s.in_flight, s.requests))
+                    session.in_flight += 1
+                    session.requests += 1
+                    break
+                wait = min(s.quarantined_until for s in self.sessions) - now
+            time.sleep(wait)
+        session.limiter.acquire()
+        return session
+
+    def succeeded(self, session):
+        session.limiter.succeeded()
+        with self.lock:
+            session.in_flight -= 1
+            session.strikes = 0
+
+    def throttled(self, session, delay=0):
+        """
+        Report a throttled request, the session backs off and is quarantined if it keeps getting throttled.
+
+        Parameters:
+            session (Session): The session that was throttled.
+            delay (float): Seconds the session pauses its requests for, see retry_delay.
+
+        """
+        session.limiter.throttled(delay)
+        with self.lock:
+            session.in_flight -= 1
+            session.throttles += 1
+            session.strikes += 1
+            now = time.monotonic()
+            others = [s for s in self.sessions if s is not session and not s.is_quarantined(now)]
+            if session.strikes >= self.max_strikes and others:
+                session.quarantined_until = now + self.quarantine_seconds
+                session.strikes = 0
+                print(f"[SessionPool]: {session.name} quarantined for {self.quarantine_seconds}s")
+
+    def failed(self, session):
+        with self.lock:
+            session.in_flight -= 1
+            session.failures += 1
+
+    def report(self):
+        now = time.monotonic()
+        return "\n".join(f"{s.name}: {s.requests} requests, {s.throttles} throttled, {s.failures} failed, "
+                         f"{s.limiter.rate:.2f}/sec" + (" (quarantined)" if s.is_quarantined(now) else "")
+                         for s in self.sessions)
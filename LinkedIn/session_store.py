@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+from requests.cookies import RequestsCookieJar
+
+from page_cache import CACHE_ROOT
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:  # sessions are only kept if cryptography is installed
+    Fernet = None
+
+# the key lives in the home folder, away from the cache folder the sessions are kept in
+KEY_PATH = os.path.join(Path.home(), ".li_scraper", "session.key")
+
+
+def load_key(key_path=KEY_PATH):
+    """
+    Get the key sessions are encrypted with, from the LI_SCRAPER_SESSION_KEY environment variable,
+    or else from key_path, where a new key is made the first time.
+
+    """
+    key = os.environ.get("LI_SCRAPER_SESSION_KEY")
+    if key:
+        return key.encode()
+    if os.path.exists(key_path):
+        with open(key_path, "rb") as f:
+            return f.read().strip()
+    key = Fernet.generate_key()
+    os.makedirs(os.path.dirname(key_path), exist_ok=True)
+    # only readable by the user
+    fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+
+class SessionStore:
+    """
+    Keeps the cookies of logged in LinkedIn sessions encrypted on disk, so a run can reuse them instead of logging in.
+
+    A session is kept until its JSESSIONID cookie expires. Needs the cryptography package, without it
+    nothing is kept and every run logs in.
+
+    Parameters:
+        root (str): Cache folder the sessions are kept in.
+        key_path (str): Path of the encryption key, see load_key.
+
+    """
+    def __init__(self, root=CACHE_ROOT, key_path=KEY_PATH):
+        self.root = os.path.join(root, "sessions")
+        self.fernet = Fernet(load_key(key_path)) if Fernet is not None else None
+
+    @property
+    def enabled(self):
+        return self.fernet is not None
+
+    def path(self, username):
+        # the email isn't used as the file name
+        return os.path.join(self.root, hashlib.sha1(username.lower().encode("utf-8")).hexdigest()[:16] + ".session")
+
+    def load(self, username):
+        """
+        Get the saved cookies of an account.
+
+        Parameters:
+            username (str): LinkedIn email.
+
+        Returns:
+            RequestsCookieJar: The cookies, or None if there is no session, it has expired or it can't be decrypted.
+
+        """
+        if not self.enabled or not os.path.exists(self.path(username)):
+            return None
+        try:
+            with open(self.path(username), "rb") as f:
+                cookies = json.loads(self.fernet.decrypt(f.read()))
+        except (InvalidToken, ValueError):
+            # made with another key or damaged, a new login replaces it
+            return None
+
+        if not any(c["name"] == "JSESSIONID" and c["expires"] and c["expires"] > time.time() for c in cookies):
+            return None
+        jar = RequestsCookieJar()
+        for c in cookies:
+            jar.set(c["name"], c["value"], domain=c["domain"], path=c["path"], expires=c["expires"], secure=c["secure"])
+        return jar
+
+    def save(self, username, cookies):
+        """
+        Save the cookies of a logged in account.
+
+        Parameters:
+            username (str): LinkedIn email.
+            cookies (RequestsCookieJar): The session's cookies.
+
+        """
+        if not self.enabled:
+            return
+        data = [{"name": c.name, "value": c.value, "domain": c.domain, "path": c.path, "expires": c.expires,
+                 "secure": c.secure} for c in cookies]
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self.path(username) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self.fernet.encrypt(json.dumps(data).encode("utf-8")))
+        os.replace(tmp_path, self.path(username))
+
+    def delete(self, username):
+        if os.path.exists(self.path(username)):
+            os.remove(self.path(username))
@@ -0,0 +1,135 @@
+from urllib.parse import quote
+
+# LinkedIn stops returning people search results past this many, no matter the total
+RESULT_CAP = 1000
+
+# facets a company search is split on, in order. A shard that still has RESULT_CAP or more results
+# is split again on the next facet. People outside every value of a facet (ie a country not listed)
+# are not reached once the search is split on it, so the lists cover the most common values.
+SHARD_FACETS = [
+    # countries, by geo urn id
+    ("geoUrn", [
+        "103644278",  # United States
+        "102713980",  # India
+        "101165590",  # United Kingdom
+        "101174742",  # Canada
+        "101282230",  # Germany
+        "105015875",  # France
+        "101452733",  # Australia
+        "106057199",  # Brazil
+        "102890719",  # Netherlands
+        "105646813",  # Spain
+        "103350119",  # Italy
+        "103323778",  # Mexico
+        "102454443",  # Singapore
+        "104738515",  # Ireland
+        "105072130",  # Poland
+        "101620260",  # Israel
+        "101355337",  # Japan
+        "102890883",  # China
+        "105117694",  # Sweden
+        "106693272",  # Switzerland
+    ]),
+    # title keywords, searched in the whole profile so shards overlap and results are deduplicated later
+    ("keywords", [
+        "engineer", "manager", "director", "analyst", "sales", "developer", "consultant", "specialist",
+        "associate", "intern", "designer", "marketing", "operations", "product", "data", "finance",
+        "recruiter", "support", "assistant", "technician", "lead", "senior", "president", "scientist",
+        "administrator", "coordinator", "representative", "architect", "accountant", "officer",
+    ]),
+]
+
+
+def shard_key(company_id, shard):
+    """
+    Get the key a shard of a company's search is cached under.
+
+    The unsharded search keeps the plain company id, so pages cached before sharding existed are still used.
+
+    Parameters:
+        company_id (str): The LinkedIn company ID.
+        shard (tuple): (facet, value) filters of the shard, empty for the whole company.
+
+    Returns:
+        str: The cache key, ie "1441|geoUrn=103644278".
+
+    """
+    return "|".join([str(company_id)] + [f"{facet}={value}" for facet, value in shard])
+
+
+def build_search_uri(company_id, offset=0, shard=()):
+    """
+    Build the voyagerSearchDashClusters uri for one page of a company's people search.
+
+    Parameters:
+        company_id (str): The LinkedIn company ID.
+        offset (int): The offset for paginating through employee data.
+        shard (tuple): (facet, value) filters to narrow the search with.
+
+    Returns:
+        str: The uri to fetch.
+
+    """
+    keywords = ""
+    parameters = [f"(key:currentCompany,value:List({company_id}))"]
+    for facet, value in shard:
+        if facet == "keywords":
+            keywords = f"keywords:{quote(value)},"
+        else:
+            parameters.append(f"(key:{facet},value:List({value}))")
+    parameters.append("(key:resultType,value:List(PEOPLE))")
+    return (f"/graphql?includeWebMetadata=true&variables=(start:{offset},origin:COMPANY_PAGE_CANNED_SEARCH,"
+            f"query:({keywords}flagshipSearchIntent:SEARCH_SRP,queryParameters:List({','.join(parameters)}),"
+            f"includeFiltersInResponse:false))&&queryId=voyagerSearchDashClusters.b0928897b71bd00a5a7291755dcd64f0")
+
+
+def plan_shards(count, facets=SHARD_FACETS, cap=RESULT_CAP, parallel_map=map):
+    """
+    Split a company's search into shards that each have fewer than cap results.
+
+    Shards are split level by level, each level adds the next facet in facets to every shard that is still too big.
+    A shard that is still too big once every facet is used is kept, and only its first cap results are reached.
+    The whole search is kept too, its first cap results reach people outside every value of the facets.
+
+    Parameters:
+        count (function): Called with a shard, returns its total number of results.
+        facets (list): (facet, values) pairs to split on, in order.
+        cap (int): Max number of results LinkedIn returns for one search.
+        parallel_map (function): map-like function used to count a whole level of shards at once.
+
+    Returns:
+        list: (shard, total) tuples, shards with no results are left out.
+
+    """
+    planned = []
+    level = [()]
+    for depth in range(len(facets) + 1):
+        totals = list(parallel_map(count, level))
+        too_big = []
+        for shard, total in zip(level, totals):
+            if total >= cap and depth < len(facets):
+                too_big.append(shard)
+                if not shard:
+                    planned.append((shard, total))
+            elif total > 0:
+                planned.append((shard, total))
+        if not too_big:
+            break
+        facet, values = facets[depth]
+        level = [shard + ((facet, value),) for shard in too_big for value in values]
+    return planned
+
+
+def shard_offsets(planned, cap=RESULT_CAP):
+    """
+    List every (shard, offset) page of a plan, in order.
+
+    Parameters:
+        planned (list): (shard, total) tuples from plan_shards.
+        cap (int): Max number of results LinkedIn returns for one search.
+
+    Returns:
+        list: (shard, offset) tuples.
+
+    """
+    return [(shard, offset) for shard, total in planned for offset in range(0, min(total, cap), 10)]